@@ -0,0 +1,162 @@
+# auth_form_test/access_rules.py
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .generation import bump_generation
+from .models import AccessRule, BusinessElement, Role
+from .permissions import (
+    ACL_GENERATION, FLAG_FIELDS, PERMISSION_BITS, PERMISSION_FLAGS, pack_flags, permission_matrix,
+    unpack_mask,
+)
+
+
+# Элементов в одном DELETE ... IN (...): ниже лимита параметров SQLite
+PRUNE_CHUNK_SIZE = 500
+
+
+class PermissionMatrixError(ValueError):
+    pass
+
+
+def parse_permissions(spec):
+    """
+    Права одного элемента -> битовая маска. Допустимые формы:
+    'all' / '*', список типов (['read', 'update']) или словарь {'read': true}.
+    """
+    if spec in ('all', '*'):
+        return sum(PERMISSION_BITS.values())
+    if spec in (None, 'none', ''):
+        return 0
+    if isinstance(spec, str):
+        spec = [spec]
+    if isinstance(spec, dict):
+        spec = [name for name, allowed in spec.items() if allowed]
+    mask = 0
+    for permission_type in spec:
+        bit = PERMISSION_BITS.get(permission_type)
+        if bit is None:
+            raise PermissionMatrixError(f'Неизвестный тип права: {permission_type}')
+        mask |= bit
+    return mask
+
+
+def _flags(mask):
+    return {
+        field: bool(mask & PERMISSION_BITS[permission_type])
+        for permission_type, field in PERMISSION_FLAGS
+    }
+
+
+def role_matrix(role):
+    """Текущие права роли в формате {element_code: [permission_type, ...]}."""
+    rows = (
+        AccessRule.objects.using(role._state.db or DEFAULT_DB_ALIAS)
+        .filter(role=role)
+        .order_by()
+        .values_list('element__code', *FLAG_FIELDS)
+    )
+    return {
+        code: [name for name, allowed in unpack_mask(pack_flags(flags)).items() if allowed]
+        for code, *flags in rows
+    }
+
+
+def _notify_changed(using):
+    # bulk_create и update не отправляют post_save, поэтому сигналим сами
+    permission_matrix.invalidate()
+    bump_generation(ACL_GENERATION, using=using)
+
+
+def _delete_rules(keys, using):
+    # По роли и порциям element_id IN (...): длинная цепочка OR из пар
+    # упирается в предел глубины выражения SQLite. _raw_delete — без
+    # post_delete на каждую строку: матрицу и поколение обновляет один
+    # _notify_changed. На AccessRule никто не ссылается, каскада нет
+    by_role = defaultdict(list)
+    for role_id, element_id in keys:
+        by_role[role_id].append(element_id)
+    for role_id, element_ids in by_role.items():
+        for start in range(0, len(element_ids), PRUNE_CHUNK_SIZE):
+            AccessRule.objects.using(using).filter(
+                role_id=role_id, element_id__in=element_ids[start:start + PRUNE_CHUNK_SIZE],
+            )._raw_delete(using)
+
+
+def apply_permission_matrix(matrix, prune=False, dry_run=False, using=DEFAULT_DB_ALIAS):
+    """
+    Применяет матрицу {role_name: {element_code: права}}.
+
+    Сравнивает её с текущими правилами и одной транзакцией upsert'ит только
+    изменившиеся строки. С prune=True правила ролей из матрицы для
+    элементов, которых в ней нет, удаляются.
+    Возвращает {'created': n, 'updated': n, 'deleted': n, 'unchanged': n}.
+    """
+    with transaction.atomic(using=using):
+        roles = dict(Role.objects.using(using).filter(name__in=list(matrix)).values_list('name', 'id'))
+        missing_roles = sorted(set(matrix) - set(roles))
+        if missing_roles:
+            raise PermissionMatrixError(f"Роли не найдены: {', '.join(missing_roles)}")
+
+        codes = {code for elements in matrix.values() for code in elements}
+        elements = dict(
+            BusinessElement.objects.using(using).filter(code__in=codes).values_list('code', 'id')
+        )
+        missing_codes = sorted(codes - set(elements))
+        if missing_codes:
+            raise PermissionMatrixError(f"Бизнес-объекты не найдены: {', '.join(missing_codes)}")
+
+        desired = {
+            (roles[role_name], elements[code]): parse_permissions(spec)
+            for role_name, role_elements in matrix.items()
+            for code, spec in role_elements.items()
+        }
+        current = {
+            (role_id, element_id): pack_flags(flags)
+            for role_id, element_id, *flags in (
+                AccessRule.objects.using(using)
+                .filter(role_id__in=roles.values())
+                .order_by()
+                .values_list('role_id', 'element_id', *FLAG_FIELDS)
+            )
+        }
+
+        changed = {key: mask for key, mask in desired.items() if current.get(key) != mask}
+        stale = set(current) - set(desired) if prune else set()
+        result = {
+            'created': sum(1 for key in changed if key not in current),
+            'updated': sum(1 for key in changed if key in current),
+            'deleted': len(stale),
+            'unchanged': len(desired) - len(changed),
+        }
+        if dry_run or not (changed or stale):
+            return result
+
+        if changed:
+            AccessRule.objects.using(using).bulk_create(
+                [
+                    AccessRule(role_id=role_id, element_id=element_id, **_flags(mask))
+                    for (role_id, element_id), mask in changed.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['role', 'element'],
+                update_fields=[*FLAG_FIELDS, 'updated_at'],
+            )
+        if stale:
+            _delete_rules(stale, using)
+        _notify_changed(using)
+    return result
+
+
+def clone_role(source, target_name, description=None, using=DEFAULT_DB_ALIAS):
+    """Создаёт (или дополняет) роль target_name правами роли source."""
+    with transaction.atomic(using=using):
+        source_role = source if isinstance(source, Role) else Role.objects.using(using).get(name=source)
+        target_role, _ = Role.objects.using(using).get_or_create(
+            name=target_name,
+            defaults={'description': description if description is not None else source_role.description},
+        )
+        result = apply_permission_matrix(
+            {target_role.name: role_matrix(source_role)}, prune=True, using=using,
+        )
+    return target_role, result
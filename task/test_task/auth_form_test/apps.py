@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AuthFormTestConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'auth_form_test'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        from django.conf import settings
+        if getattr(settings, 'PRECOMPILE_TEMPLATES', False):
+            from .template_cache import warm_templates
+            warm_templates(raise_errors=True)
@@ -0,0 +1,78 @@
+# auth_form_test/archive.py
+import datetime
+import time
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from .email_index import EMAIL_GENERATION
+from .generation import bump_generation
+from .metrics import registry
+
+
+users_archived = registry.counter(
+    'auth_users_archived_total', 'Пользователей перенесено в users_archive',
+)
+
+ARCHIVE_FIELDS = ('id', 'email', 'name', 'last_name', 'password', 'date_reg', 'deactivated_at')
+
+
+def archive_cutoff(days):
+    return timezone.now() - datetime.timedelta(days=days)
+
+
+def archive_candidates(cutoff, using=DEFAULT_DB_ALIAS):
+    from .models import AppUser
+
+    # Условие совпадает с частичным индексом users_deactivated_at_idx
+    return (
+        AppUser.objects.using(using)
+        .filter(isActive=False, deactivated_at__lt=cutoff)
+        .order_by('deactivated_at')
+    )
+
+
+def archive_batch(cutoff, batch_size=500, using=DEFAULT_DB_ALIAS):
+    """
+    Переносит до batch_size пользователей, деактивированных раньше cutoff,
+    в users_archive. Копирование и удаление — одна короткая транзакция.
+
+    Возвращает число перенесённых строк.
+    """
+    from .models import AppUser, ArchivedUser
+
+    with transaction.atomic(using=using):
+        rows = list(
+            archive_candidates(cutoff, using)
+            .select_related('role')
+            .only(*ARCHIVE_FIELDS, 'role__name')[:batch_size]
+        )
+        if not rows:
+            return 0
+        ArchivedUser.objects.using(using).bulk_create([
+            ArchivedUser(
+                **{field: getattr(user, field) for field in ARCHIVE_FIELDS},
+                role_name=user.role.name if user.role else '',
+            )
+            for user in rows
+        ])
+        AppUser.objects.using(using).filter(pk__in=[user.pk for user in rows]).delete()
+        # Освободившиеся email уйдут из фильтров при пересборке
+        bump_generation(EMAIL_GENERATION, using=using)
+    users_archived.inc(amount=len(rows))
+    return len(rows)
+
+
+def archive_deactivated(days=90, batch_size=500, limit=None, pause=0.0, using=DEFAULT_DB_ALIAS):
+    """Переносит в архив всех, кто деактивирован больше days дней назад (не больше limit)."""
+    cutoff = archive_cutoff(days)
+    archived = 0
+    while limit is None or archived < limit:
+        size = batch_size if limit is None else min(batch_size, limit - archived)
+        moved = archive_batch(cutoff, size, using)
+        archived += moved
+        if moved < size:
+            break
+        if pause:
+            time.sleep(pause)
+    return archived
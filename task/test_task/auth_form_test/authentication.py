@@ -0,0 +1,160 @@
+# auth_form_test/authentication.py
+import datetime
+import functools
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .token_cache import token_cache
+
+
+JWT_ALGORITHM = 'HS256'
+JWT_COOKIE_NAME = 'auth_token'
+
+
+@functools.lru_cache(maxsize=None)
+def get_signing_key():
+    # Ключ вычисляется один раз на процесс; сбрасывается при смене настроек
+    return getattr(settings, 'JWT_SECRET_KEY', None) or settings.SECRET_KEY
+
+
+def get_request_token(request):
+    header = request.headers.get('Authorization', '')
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() == 'bearer' and token:
+        return token.strip()
+    return request.COOKIES.get(JWT_COOKIE_NAME)
+
+
+def decode_token(token):
+    import jwt
+
+    try:
+        return jwt.decode(
+            token,
+            get_signing_key(),
+            algorithms=[JWT_ALGORITHM],
+            options={'require': ['exp', 'user_id', 'jti']},
+        )
+    except jwt.InvalidTokenError:
+        return None
+
+
+def is_token_revoked(claims):
+    # Общий для всех воркеров список отзыва: revoked_sessions + поколение 'sessions'
+    from .session_store import revocation_list
+
+    return revocation_list.is_revoked(claims['jti'])
+
+
+def verify_token(token):
+    claims = token_cache.get(token)
+    if claims is None:
+        if token_cache.is_revoked(token):
+            return None
+        claims = decode_token(token)
+        if claims is None:
+            return None
+        token_cache.set(token, claims)
+    # И для попадания в кэш: токен могли отозвать в другом воркере
+    if is_token_revoked(claims):
+        token_cache.revoke(token, expires_at=claims['exp'])
+        return None
+    return claims
+
+
+def revoke_token(token, claims):
+    from .session_store import revocation_list
+
+    token_cache.revoke(token, expires_at=claims['exp'])
+    expires_at = datetime.datetime.fromtimestamp(claims['exp'], tz=datetime.timezone.utc)
+    revocation_list.revoke(claims['jti'], expires_at)
+
+
+def revoke_request_token(request):
+    # Вызывается при выходе и деактивации: токен перестаёт приниматься
+    # сразу во всех воркерах. Отзываем и присланный токен, и выданный при
+    # входе (session['jwt_token']) — клиент мог не прислать cookie
+    app_user = getattr(request, 'app_user', None)
+    request_token = get_request_token(request)
+    for token in {request_token, request.session.get('jwt_token')} - {None, ''}:
+        if app_user is not None and token == request_token:
+            claims = app_user.claims
+        else:
+            claims = decode_token(token)
+        if claims is not None:
+            revoke_token(token, claims)
+
+
+class JWTUser:
+    """
+    Пользователь из проверенного JWT.
+
+    id и email берутся из claims без обращения к БД; строка из таблицы
+    users загружается только при доступе к любому другому полю.
+    """
+
+    is_authenticated = True
+
+    def __init__(self, claims):
+        self.claims = claims
+        self.id = claims['user_id']
+        self.email = claims.get('email')
+        self._user = None
+
+    @property
+    def pk(self):
+        return self.id
+
+    def resolve(self):
+        # Может выбросить AppUser.DoesNotExist
+        if self._user is None:
+            from .models import AppUser
+
+            self._user = AppUser.objects.get(id=self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __str__(self):
+        return self.email or str(self.id)
+
+
+class JWTAuthenticationMiddleware:
+    """
+    Проверяет токен из заголовка Authorization: Bearer или cookie auth_token
+    и кладёт ленивого пользователя в request.app_user (None, если токена
+    нет или он недействителен). Таблица сессий при этом не читается.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.app_user = None
+        token = get_request_token(request)
+        if token:
+            claims = verify_token(token)
+            if claims is not None:
+                request.app_user = JWTUser(claims)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.app_user = None
+        token = get_request_token(request)
+        if token:
+            # Проверка отзыва может читать revoked_sessions
+            claims = await sync_to_async(verify_token)(token)
+            if claims is not None:
+                request.app_user = JWTUser(claims)
+        return await self.get_response(request)
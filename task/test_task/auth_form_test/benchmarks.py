@@ -0,0 +1,330 @@
+# auth_form_test/benchmarks.py
+import contextlib
+import itertools
+import math
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples):
+    # Времена в секундах -> сводка в миллисекундах
+    return {
+        'count': len(samples),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3) if samples else 0.0,
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+@contextlib.contextmanager
+def temporary_database():
+    # Прогон идёт на временной файловой базе: рабочие данные не трогаем,
+    # а потоки видят одну и ту же БД (в отличие от in-memory)
+    fd, db_path = tempfile.mkstemp(suffix='.sqlite3', prefix='auth-bench-')
+    os.close(fd)
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    test_settings['NAME'] = db_path
+    try:
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        yield db_path
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if old_test_name is None:
+            test_settings.pop('NAME', None)
+        else:
+            test_settings['NAME'] = old_test_name
+        for path in (db_path, f'{db_path}-wal', f'{db_path}-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+BENCH_PASSWORD = 'bench-password-123'
+PERMISSION_TYPES = ('read', 'create', 'update', 'delete', 'read_all', 'update_all', 'delete_all')
+
+
+def seed(users=100, roles=5, elements=20):
+    from .models import AppUser, Role, BusinessElement, AccessRule
+
+    role_objs = Role.objects.bulk_create(
+        Role(name=f'bench-role-{i}') for i in range(roles)
+    )
+    element_objs = BusinessElement.objects.bulk_create(
+        BusinessElement(name=f'Bench element {i}', code=f'bench_{i}') for i in range(elements)
+    )
+    AccessRule.objects.bulk_create(
+        AccessRule(
+            role=role, element=element,
+            can_read=True,
+            can_create=(i + j) % 2 == 0,
+            can_update=(i + j) % 3 == 0,
+            can_delete=(i + j) % 5 == 0,
+        )
+        for i, role in enumerate(role_objs)
+        for j, element in enumerate(element_objs)
+    )
+    # Один хеш на всех: сидирование не должно зависеть от стоимости PBKDF2
+    password = make_password(BENCH_PASSWORD)
+    user_objs = AppUser.objects.bulk_create(
+        AppUser(
+            email=f'bench-{i}@example.com',
+            name=f'Bench{i}',
+            last_name='User',
+            password=password,
+            role=role_objs[i % roles] if role_objs else None,
+        )
+        for i in range(users)
+    )
+    return {
+        'users': user_objs,
+        'element_codes': [element.code for element in element_objs],
+    }
+
+
+class Worker:
+    """Состояние одного потока нагрузки: свой Client и свой залогиненный пользователь."""
+
+    def __init__(self, data, index):
+        self.data = data
+        self.index = index
+        self.user = data['users'][index % len(data['users'])]
+        self.client = Client()
+        self.logged_in = False
+
+    def login(self):
+        response = self.client.post(reverse('login'), {
+            'email': self.user.email,
+            'password': BENCH_PASSWORD,
+        })
+        self.logged_in = response.status_code == 302
+        return response.status_code == 302
+
+    def ensure_logged_in(self):
+        if not self.logged_in:
+            self.login()
+
+
+def scenario_login(worker, step):
+    worker.client = Client()
+    return worker.login()
+
+
+def scenario_register(worker, step):
+    response = Client().post(reverse('register'), {
+        'email': f'bench-new-{uuid.uuid4().hex}@example.com',
+        'name': 'New',
+        'last_name': 'User',
+        'password': BENCH_PASSWORD,
+        'password_confirm': BENCH_PASSWORD,
+    })
+    return response.status_code == 302
+
+
+def scenario_dashboard(worker, step):
+    return worker.client.get(reverse('dashboard')).status_code == 200
+
+
+def scenario_update_profile(worker, step):
+    response = worker.client.post(reverse('update_profile'), {
+        'email': worker.user.email,
+        'name': f'Bench{step}',
+        'last_name': 'User',
+    })
+    return response.status_code == 302
+
+
+def scenario_check_permission(worker, step):
+    codes = worker.data['element_codes']
+    worker.user.check_permission(codes[step % len(codes)], PERMISSION_TYPES[step % len(PERMISSION_TYPES)])
+    return True
+
+
+SCENARIOS = {
+    'login': (scenario_login, False),
+    'register': (scenario_register, False),
+    'dashboard': (scenario_dashboard, True),
+    'update_profile': (scenario_update_profile, True),
+    'check_permission': (scenario_check_permission, False),
+}
+
+
+def run_scenario(name, data, requests=200, concurrency=4):
+    scenario, needs_login = SCENARIOS[name]
+    workers = [Worker(data, index) for index in range(concurrency)]
+    if needs_login:
+        for worker in workers:
+            worker.ensure_logged_in()
+
+    steps = itertools.count()
+    steps_lock = threading.Lock()
+    latencies = []
+    query_counts = []
+    errors = 0
+    results_lock = threading.Lock()
+
+    def drive(worker):
+        nonlocal errors
+        local_latencies, local_queries, local_errors = [], [], 0
+        try:
+            while True:
+                with steps_lock:
+                    step = next(steps)
+                if step >= requests:
+                    break
+                queries = [0]
+
+                def wrapper(execute, sql, params, many, context):
+                    queries[0] += 1
+                    return execute(sql, params, many, context)
+
+                started = time.perf_counter()
+                with connection.execute_wrapper(wrapper):
+                    try:
+                        ok = scenario(worker, step)
+                    except Exception:
+                        ok = False
+                local_latencies.append(time.perf_counter() - started)
+                local_queries.append(queries[0])
+                local_errors += 0 if ok else 1
+        finally:
+            connection.close()
+        with results_lock:
+            latencies.extend(local_latencies)
+            query_counts.extend(local_queries)
+            errors += local_errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(drive, workers))
+    wall_time = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / wall_time, 2) if wall_time else 0.0,
+        'queries_per_request': round(sum(query_counts) / len(query_counts), 2) if query_counts else 0.0,
+        **summarize(latencies),
+    }
+
+
+# Метрики, рост которых считается регрессией; для throughput — падение
+REGRESSION_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request')
+
+
+def compare(results, baseline, tolerance=0.2):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in REGRESSION_METRICS:
+            if metric in previous and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f'{name}.{metric}: {previous[metric]} -> {current[metric]}')
+        if 'throughput_rps' in previous and current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            regressions.append(
+                f"{name}.throughput_rps: {previous['throughput_rps']} -> {current['throughput_rps']}"
+            )
+        if current['errors'] > previous.get('errors', 0):
+            regressions.append(f"{name}.errors: {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+# Холодный старт: отдельный процесс поднимает WSGI-приложение и обслуживает
+# один запрос; время считается от запуска интерпретатора до ответа
+BOOT_SCRIPT = '''
+import sys
+from wsgiref.util import setup_testing_defaults
+
+from django.core.wsgi import get_wsgi_application
+
+application = get_wsgi_application()
+environ = {'PATH_INFO': sys.argv[1]}
+setup_testing_defaults(environ)
+statuses = []
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+print(statuses[0], flush=True)
+'''
+
+
+def run_boot(path, env, cwd, importtime=False):
+    import subprocess
+    import sys
+
+    command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', BOOT_SCRIPT, path]
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        command, env=env, cwd=cwd, text=True,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    status = process.stdout.readline().strip()
+    elapsed = time.perf_counter() - started
+    _, stderr = process.communicate()
+    ok = process.returncode == 0 and status[:1] in ('2', '3')
+    return elapsed, ok, stderr
+
+
+def measure_boot(path, env, cwd, runs=5):
+    samples, errors = [], 0
+    for _ in range(runs):
+        elapsed, ok, _ = run_boot(path, env, cwd)
+        samples.append(elapsed)
+        errors += 0 if ok else 1
+    return {'runs': runs, 'errors': errors, **summarize(samples)}
+
+
+def parse_importtime(stderr):
+    # Строки вида «import time:   self |  cumulative |   пакет»
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue
+        rows.append({
+            'module': module.strip(),
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'depth': (len(module) - len(module.lstrip()) - 1) // 2,
+        })
+    return rows
+
+
+def summarize_imports(rows, top=20):
+    packages = {}
+    for row in rows:
+        package = row['module'].split('.')[0]
+        packages[package] = packages.get(package, 0) + row['self_us']
+    return {
+        'modules': len(rows),
+        'total_ms': round(sum(row['self_us'] for row in rows) / 1000, 1),
+        'packages_ms': {
+            package: round(us / 1000, 1)
+            for package, us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        },
+        'slowest': [
+            (row['module'], round(row['cumulative_us'] / 1000, 1))
+            for row in sorted(rows, key=lambda row: -row['cumulative_us'])[:top]
+        ],
+    }
@@ -0,0 +1,265 @@
+# auth_form_test/bulk_users.py
+import csv
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+
+from .email_index import EMAIL_GENERATION
+from .forms import UserRegistrationForm
+from .generation import bump_generation
+from .models import AppUser, Role
+
+
+EXPORT_FIELDS = ('id', 'email', 'name', 'last_name', 'isActive', 'date_reg', 'role')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'да'}
+PASSWORD_MIN_LENGTH = UserRegistrationForm.base_fields['password'].min_length
+
+
+def detect_format(path, explicit=None):
+    if explicit:
+        return explicit
+    return 'jsonl' if str(path).endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+class InvalidRow:
+    # Строка, которую не удалось разобрать: попадает в ошибки импорта с номером строки
+
+    def __init__(self, message):
+        self.message = message
+
+
+def read_rows(stream, fmt):
+    """
+    (номер строки, запись) по одной — файл целиком в память не загружается.
+
+    Неразбираемая строка JSONL отдаётся как InvalidRow, чтобы импорт
+    продолжился со следующей.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, InvalidRow(f'некорректный JSON ({e.msg}, позиция {e.pos})')
+            continue
+        if not isinstance(row, dict):
+            yield line_no, InvalidRow('ожидается JSON-объект')
+            continue
+        yield line_no, row
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def _text(value):
+    # В JSONL значения бывают числами или null
+    return '' if value is None else str(value).strip()
+
+
+def _parse_bool(value, default=True):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _init_hashing_worker():
+    import django
+
+    django.setup()
+
+
+class UserImporter:
+    """
+    Пакетный импорт пользователей.
+
+    На каждый пакет: один запрос на проверку занятых email, хеширование
+    паролей в пуле процессов (или готовые хеши из поля password_hash)
+    и bulk_create внутри транзакции.
+    """
+
+    def __init__(self, batch_size=1000, workers=None, dry_run=False):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.dry_run = dry_run
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+        self._roles = None
+        self._pool = None
+
+    def __enter__(self):
+        if self.workers != 0:
+            self.workers = self.workers or os.cpu_count() or 1
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_hashing_worker)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    def _role_id(self, name):
+        if self._roles is None:
+            self._roles = dict(Role.objects.order_by().values_list('name', 'id'))
+        return self._roles.get(name)
+
+    def _hash_passwords(self, passwords):
+        if self._pool is None:
+            return [make_password(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._pool.map(make_password, passwords, chunksize=chunksize))
+
+    def _validate(self, line_no, row, seen):
+        if isinstance(row, InvalidRow):
+            self.errors.append(f'строка {line_no}: {row.message}')
+            return None
+        email = _text(row.get('email'))
+        try:
+            validate_email(email)
+        except ValidationError:
+            self.errors.append(f'строка {line_no}: некорректный email {email!r}')
+            return None
+        if email in seen:
+            self.errors.append(f'строка {line_no}: email {email} повторяется во входных данных')
+            return None
+        name = _text(row.get('name'))
+        last_name = _text(row.get('last_name'))
+        if not name or not last_name:
+            self.errors.append(f'строка {line_no}: не заполнены name/last_name')
+            return None
+        password_hash = _text(row.get('password_hash'))
+        password = '' if row.get('password') is None else str(row['password'])
+        if password_hash:
+            try:
+                identify_hasher(password_hash)
+            except ValueError:
+                self.errors.append(f'строка {line_no}: неизвестный формат password_hash')
+                return None
+        elif not password:
+            self.errors.append(f'строка {line_no}: нужен password или password_hash')
+            return None
+        elif len(password) < PASSWORD_MIN_LENGTH:
+            # То же ограничение, что у формы регистрации
+            self.errors.append(f'строка {line_no}: пароль короче {PASSWORD_MIN_LENGTH} символов')
+            return None
+        role_name = _text(row.get('role'))
+        role_id = self._role_id(role_name) if role_name else None
+        if role_name and role_id is None:
+            self.errors.append(f'строка {line_no}: роль {role_name!r} не найдена')
+            return None
+        seen.add(email)
+        return {
+            'email': email,
+            'name': name,
+            'last_name': last_name,
+            'password': password,
+            'password_hash': password_hash,
+            'isActive': _parse_bool(row.get('isActive')),
+            'role_id': role_id,
+        }
+
+    def import_batch(self, numbered_rows, seen):
+        valid = [
+            cleaned
+            for line_no, row in numbered_rows
+            if (cleaned := self._validate(line_no, row, seen)) is not None
+        ]
+        if not valid:
+            return
+
+        existing = set(
+            AppUser.objects.order_by()
+            .filter(email__in=[row['email'] for row in valid])
+            .values_list('email', flat=True)
+        )
+        fresh = [row for row in valid if row['email'] not in existing]
+        self.skipped += len(valid) - len(fresh)
+
+        to_hash = [row for row in fresh if not row['password_hash']]
+        for row, hashed in zip(to_hash, self._hash_passwords([row['password'] for row in to_hash])):
+            row['password_hash'] = hashed
+
+        now = timezone.now()
+        users = [
+            AppUser(
+                email=row['email'],
+                name=row['name'],
+                last_name=row['last_name'],
+                password=row['password_hash'],
+                isActive=row['isActive'],
+                deactivated_at=None if row['isActive'] else now,
+                role_id=row['role_id'],
+            )
+            for row in fresh
+        ]
+        if self.dry_run:
+            self.created += len(users)
+            return
+        with transaction.atomic():
+            # Email могли зарегистрировать после проверки выше: такие строки
+            # пропускаются, а не откатывают весь пакет
+            AppUser.objects.bulk_create(users, batch_size=self.batch_size, ignore_conflicts=True)
+            # id генерируются на клиенте — вставленные строки находятся по ним
+            inserted = AppUser.objects.filter(pk__in=[user.pk for user in users]).count()
+            # bulk_create не шлёт post_save: фильтры email пересоберутся по поколению
+            bump_generation(EMAIL_GENERATION)
+        self.created += inserted
+        self.skipped += len(users) - inserted
+
+    def run(self, numbered_rows):
+        # numbered_rows — пары (номер строки, запись) из read_rows;
+        # seen — email уже принятых строк, для дублей внутри файла
+        seen = set()
+        for batch in batched(numbered_rows, self.batch_size):
+            self.import_batch(batch, seen)
+        return self
+
+
+def export_rows(queryset=None, chunk_size=2000, include_password_hash=False):
+    queryset = AppUser.objects.all() if queryset is None else queryset
+    fields = ['id', 'email', 'name', 'last_name', 'isActive', 'date_reg', 'role__name']
+    if include_password_hash:
+        fields.append('password')
+    # iterator() читает курсором порциями: память не растёт с размером таблицы
+    for values in queryset.order_by().values_list(*fields).iterator(chunk_size=chunk_size):
+        row = dict(zip(EXPORT_FIELDS, values[:len(EXPORT_FIELDS)]))
+        row['id'] = str(row['id'])
+        row['date_reg'] = row['date_reg'].isoformat()
+        row['role'] = row['role'] or ''
+        if include_password_hash:
+            row['password_hash'] = values[-1]
+        yield row
+
+
+def write_rows(stream, rows, fmt, include_password_hash=False):
+    count = 0
+    if fmt == 'csv':
+        fieldnames = list(EXPORT_FIELDS) + (['password_hash'] if include_password_hash else [])
+        writer = csv.DictWriter(stream, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        count += 1
+    return count
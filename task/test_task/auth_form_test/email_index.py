@@ -0,0 +1,242 @@
+# auth_form_test/email_index.py
+import datetime
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from .generation import current_generation
+from .metrics import Gauge, registry
+
+
+# Массовый импорт и архивация: фильтр пересобирается целиком
+EMAIL_GENERATION = 'emails'
+# Регистрация и смена email: догружаются только изменённые строки
+EMAIL_DELTA_GENERATION = 'emails_delta'
+
+email_checks = registry.counter(
+    'auth_email_index_checks_total',
+    'Проверки занятости email: negative — ответ фильтра без БД, '
+    'true_positive / false_positive — результат проверки в БД',
+    ('result',),
+)
+email_index_rebuilds = registry.counter(
+    'auth_email_index_rebuilds_total', 'Пересборки фильтра Блума email',
+)
+email_index_delta_syncs = registry.counter(
+    'auth_email_index_delta_syncs_total', 'Догрузки новых и изменённых email в фильтр',
+)
+
+
+class BloomFilter:
+    """
+    Фильтр Блума для строк: «нет» — точно нет, «да» — возможно есть.
+
+    Размер и число хеш-функций подбираются под capacity элементов и
+    долю ложных срабатываний error_rate. Позиции — двойное хеширование
+    одного blake2b.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * step) % self.size for index in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+    def estimated_error_rate(self):
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+def get_email_index_settings():
+    return {
+        'ENABLED': True,
+        'CAPACITY': 100000,
+        'ERROR_RATE': 0.01,
+        # Как часто сверять поколения фильтра (0 — при каждой проверке)
+        'SYNC_INTERVAL': 1.0,
+        **getattr(settings, 'EMAIL_INDEX', {}),
+    }
+
+
+class EmailIndex:
+    """
+    Фильтр Блума по всем email таблицы users.
+
+    Собирается одним проходом по таблице при первой проверке после
+    старта и после смены поколения EMAIL_GENERATION. При смене
+    EMAIL_DELTA_GENERATION догружаются только строки, изменённые после
+    прошлой синхронизации (с запасом SYNC_OVERLAP на задержку коммита и
+    расхождение часов). Поколения сверяются не чаще раза в SYNC_INTERVAL
+    секунд; сохранения в этом воркере добавляют email сразу. Удалённые
+    и старые адреса остаются в фильтре до пересборки — это лишь ложные
+    срабатывания, которые проверяются в БД.
+    """
+
+    SYNC_OVERLAP = datetime.timedelta(seconds=60)
+
+    def __init__(self):
+        self._filter = None
+        self._generation = None
+        self._delta_generation = None
+        self._synced_at = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        from .models import AppUser
+
+        config = get_email_index_settings()
+        self._loaded_at = timezone.now()
+        emails = AppUser.objects.using(DEFAULT_DB_ALIAS).order_by().values_list('email', flat=True)
+        # Запас вдвое, чтобы регистрации до следующей пересборки не поднимали долю ошибок
+        bloom = BloomFilter(max(config['CAPACITY'], 2 * emails.count()), config['ERROR_RATE'])
+        for email in emails.iterator(chunk_size=5000):
+            bloom.add(email)
+        email_index_rebuilds.inc()
+        return bloom
+
+    def _load_changes(self, bloom):
+        from .models import AppUser
+
+        now = timezone.now()
+        emails = list(
+            AppUser.objects.using(DEFAULT_DB_ALIAS)
+            .filter(updated_at__gte=self._loaded_at - self.SYNC_OVERLAP)
+            .order_by()
+            .values_list('email', flat=True)
+        )
+        with self._lock:
+            if self._filter is not bloom:
+                return
+            for email in emails:
+                bloom.add(email)
+            self._loaded_at = now
+            # Запас ёмкости израсходован: дальше — полная пересборка
+            if len(bloom) > bloom.capacity:
+                self._filter = None
+        email_index_delta_syncs.inc()
+
+    def _sync(self):
+        now = time.monotonic()
+        interval = get_email_index_settings()['SYNC_INTERVAL']
+        if self._synced_at is not None and now - self._synced_at < interval:
+            return
+        generation = current_generation(EMAIL_GENERATION)
+        delta_generation = current_generation(EMAIL_DELTA_GENERATION)
+        with self._lock:
+            self._synced_at = now
+            bloom = self._filter
+            changed = delta_generation != self._delta_generation
+            self._delta_generation = delta_generation
+            if generation != self._generation:
+                self._filter = None
+                self._generation = generation
+                return
+        if bloom is not None and changed:
+            self._load_changes(bloom)
+
+    def _current(self):
+        self._sync()
+        bloom = self._filter
+        if bloom is None:
+            with self._lock:
+                if self._filter is None:
+                    self._filter = self._build()
+                bloom = self._filter
+        return bloom
+
+    def might_contain(self, email):
+        return email in self._current()
+
+    def add(self, email):
+        bloom = self._filter
+        if bloom is not None:
+            bloom.add(email)
+
+    def invalidate(self):
+        with self._lock:
+            self._filter = None
+            self._generation = None
+            self._delta_generation = None
+            self._synced_at = None
+            self._loaded_at = None
+
+    def stats(self):
+        bloom = self._filter
+        if bloom is None:
+            return None
+        return {
+            'entries': len(bloom),
+            'bits': bloom.size,
+            'hashes': bloom.hashes,
+            'estimated_error_rate': bloom.estimated_error_rate(),
+        }
+
+
+email_index = EmailIndex()
+
+
+def email_exists(email):
+    """
+    Занят ли email.
+
+    Отрицательный ответ фильтра — без запроса к БД; при возможном
+    совпадении проверяется exists() по уникальному индексу email.
+    """
+    from .models import AppUser
+
+    if not get_email_index_settings()['ENABLED']:
+        return AppUser.objects.filter(email=email).exists()
+    if not email_index.might_contain(email):
+        email_checks.inc('negative')
+        return False
+    exists = AppUser.objects.filter(email=email).exists()
+    email_checks.inc('true_positive' if exists else 'false_positive')
+    return exists
+
+
+@registry.register_collector
+def email_index_metrics():
+    negatives = email_checks.value('negative')
+    false_positives = email_checks.value('false_positive')
+    observed = Gauge(
+        'auth_email_index_false_positive_ratio',
+        'Доля свободных email, для которых фильтр ответил «возможно занят»',
+    )
+    if negatives + false_positives:
+        observed.set(value=false_positives / (negatives + false_positives))
+    metrics = [observed]
+
+    stats = email_index.stats()
+    if stats is not None:
+        estimated = Gauge(
+            'auth_email_index_estimated_error_rate', 'Расчётная доля ложных срабатываний фильтра',
+        )
+        estimated.set(value=stats['estimated_error_rate'])
+        entries = Gauge('auth_email_index_entries', 'Email в фильтре Блума')
+        entries.set(value=stats['entries'])
+        metrics += [estimated, entries]
+    return metrics
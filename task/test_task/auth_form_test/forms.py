@@ -1,10 +1,10 @@
 
 from django import forms
+from .email_index import email_exists
 from .models import AppUser
-from django.contrib.auth.hashers import make_password
-from django import forms
-from .models import AppUser
-from django.contrib.auth.hashers import check_password
+
+
+LOGIN_USER_FIELDS = ('id', 'email', 'name', 'last_name', 'password', 'isActive', 'role__name')
 
 
 class LoginForm(forms.Form):
@@ -26,6 +26,11 @@ class LoginForm(forms.Form):
         label='Пароль'
     )
 
+    def __init__(self, *args, verify_password=True, **kwargs):
+        # Асинхронный вход проверяет пароль сам, в пуле хеширования
+        self.verify_password = verify_password
+        super().__init__(*args, **kwargs)
+
     def clean(self):
         cleaned_data = super().clean()
         email = cleaned_data.get('email')
@@ -34,23 +39,37 @@ class LoginForm(forms.Form):
         if email and password:
             try:
 
-                user = AppUser.objects.get(email=email)
-
+                # Одна выборка по частичному индексу активных email: всё,
+                # что нужно для сессии, JWT и JSON-ответа
+                user = (
+                    AppUser.active
+                    .select_related('role')
+                    .only(*LOGIN_USER_FIELDS)
+                    .get(email=email)
+                )
 
-                if not user.isActive:
-                    raise forms.ValidationError("Аккаунт деактивирован. Обратитесь к администратору.")
-
-                if not check_password(password, user.password):
+                if self.verify_password and not self._check_password(password, user):
                     raise forms.ValidationError("Неверный email или пароль")
 
 
                 cleaned_data['user'] = user
 
             except AppUser.DoesNotExist:
+                # Второй запрос только для неудачного входа
+                if AppUser.objects.filter(email=email, isActive=False).exists():
+                    raise forms.ValidationError("Аккаунт деактивирован. Обратитесь к администратору.")
                 raise forms.ValidationError("Неверный email или пароль")
 
         return cleaned_data
 
+    def _check_password(self, password, user):
+        # Хешеры загружаются при первой проверке пароля, а не при старте воркера
+        from django.contrib.auth.hashers import check_password
+        from .hashing import password_upgrade_setter
+
+        return check_password(password, user.password, setter=password_upgrade_setter(user))
+
+
 class UserRegistrationForm(forms.Form):
     email = forms.EmailField(
         widget=forms.EmailInput(attrs={
@@ -111,18 +130,19 @@ class UserRegistrationForm(forms.Form):
 
 
         email = cleaned_data.get('email')
-        if email and AppUser.objects.filter(email=email).exists():
+        if email and email_exists(email):
             raise forms.ValidationError("Пользователь с таким email уже существует")
 
         return cleaned_data
 
-    def save(self):
+    def save(self, password_hash=None):
+        from django.contrib.auth.hashers import make_password
 
         user = AppUser(
             email=self.cleaned_data['email'],
             name=self.cleaned_data['name'],
             last_name=self.cleaned_data['last_name'],
-            password=make_password(self.cleaned_data['password']),
+            password=password_hash or make_password(self.cleaned_data['password']),
             isActive=True,
 
         )
@@ -207,12 +227,12 @@ class UserUpdateForm(forms.Form):
 
         email = cleaned_data.get('email')
         if email and self.user and email != self.user.email:
-            if AppUser.objects.filter(email=email).exists():
+            if email_exists(email):
                 raise forms.ValidationError("Пользователь с таким email уже существует")
 
         return cleaned_data
 
-    def save(self):
+    def save(self, password_hash=None):
 
         if not self.user:
             raise ValueError("Пользователь не указан")
@@ -224,7 +244,9 @@ class UserUpdateForm(forms.Form):
 
 
         new_password = self.cleaned_data.get('new_password')
-        if new_password:
+        if password_hash:
+            self.user.password = password_hash
+        elif new_password:
             from django.contrib.auth.hashers import make_password
             self.user.password = make_password(new_password)
 
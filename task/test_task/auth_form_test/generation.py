@@ -0,0 +1,157 @@
+# auth_form_test/generation.py
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+COUNTER_FORMAT = '<Q'
+COUNTER_SIZE = struct.calcsize(COUNTER_FORMAT)
+
+
+class DatabaseGenerationBackend:
+    """Счётчики поколений в таблице основной БД (по строке на счётчик)."""
+
+    def __init__(self, using='default'):
+        self.using = using
+
+    def get(self, name):
+        from .models import GenerationCounter
+
+        values = list(
+            GenerationCounter.objects.using(self.using)
+            .filter(name=name)
+            .values_list('value', flat=True)[:1]
+        )
+        return values[0] if values else 0
+
+    def bump(self, name):
+        from django.db.models import F
+        from .models import GenerationCounter
+
+        with transaction.atomic(using=self.using):
+            updated = (
+                GenerationCounter.objects.using(self.using)
+                .filter(name=name)
+                .update(value=F('value') + 1)
+            )
+            if not updated:
+                GenerationCounter.objects.using(self.using).get_or_create(
+                    name=name, defaults={'value': 1}
+                )
+        return self.get(name)
+
+
+class FileGenerationBackend:
+    """
+    Счётчики поколений в файлах, отображённых в память (mmap).
+
+    Чтение — это распаковка 8 байт из общей страницы без системных
+    вызовов; увеличение выполняется под flock, поэтому подходит для
+    нескольких воркеров на одной машине.
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.BASE_DIR / 'acl_generation')
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def _file_path(self, name):
+        return os.path.join(self.path, f'{name}.gen')
+
+    def _map(self, name):
+        mapped = self._maps.get(name)
+        if mapped is not None:
+            return mapped
+        with self._lock:
+            mapped = self._maps.get(name)
+            if mapped is None:
+                os.makedirs(self.path, exist_ok=True)
+                fd = os.open(self._file_path(name), os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    if os.fstat(fd).st_size < COUNTER_SIZE:
+                        os.ftruncate(fd, COUNTER_SIZE)
+                    mapped = mmap.mmap(fd, COUNTER_SIZE)
+                finally:
+                    os.close(fd)
+                self._maps[name] = mapped
+            return mapped
+
+    def get(self, name):
+        return struct.unpack_from(COUNTER_FORMAT, self._map(name))[0]
+
+    def bump(self, name):
+        import fcntl
+
+        mapped = self._map(name)
+        with open(self._file_path(name), 'rb') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                value = struct.unpack_from(COUNTER_FORMAT, mapped)[0] + 1
+                struct.pack_into(COUNTER_FORMAT, mapped, 0, value)
+                mapped.flush()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return value
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = getattr(settings, 'GENERATION_BACKEND', {})
+                backend_class = import_string(config.get(
+                    'BACKEND', 'auth_form_test.generation.DatabaseGenerationBackend'
+                ))
+                _backend = backend_class(**config.get('OPTIONS', {}))
+    return _backend
+
+
+def reset_backend():
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+def current_generation(name):
+    return get_backend().get(name)
+
+
+def bump_generation(name, using='default'):
+    """
+    Увеличивает счётчик name после коммита текущей транзакции.
+
+    Внутри одного atomic-блока счётчик увеличивается один раз, сколько бы
+    строк ни изменилось: повторный вызов ничего не делает, пока колбэк
+    для name с теми же savepoint_ids стоит в очереди on_commit (откат
+    точки сохранения убирает его оттуда — тогда он регистрируется заново).
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        get_backend().bump(name)
+        return
+    pending = connection.__dict__.setdefault('_pending_generation_bumps', {})
+    if not connection.run_on_commit:
+        # Очередь пуста — записи от откаченных транзакций больше не нужны
+        pending.clear()
+    key = (name, tuple(connection.savepoint_ids))
+    queued = pending.get(key)
+    if queued is not None and any(func is queued for _, func, _ in connection.run_on_commit):
+        return
+
+    def bump():
+        if pending.get(key) is bump:
+            del pending[key]
+        get_backend().bump(name)
+
+    pending[key] = bump
+    transaction.on_commit(bump, using=using)
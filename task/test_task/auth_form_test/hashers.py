@@ -0,0 +1,34 @@
+# auth_form_test/hashers.py
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+DEFAULT_ITERATIONS = PBKDF2PasswordHasher.iterations
+
+
+def get_hasher_profile():
+    profiles = getattr(settings, 'PASSWORD_HASHER_PROFILES', {})
+    name = getattr(settings, 'PASSWORD_HASHER_PROFILE', 'default')
+    return profiles.get(name, {})
+
+
+class ProfilePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 с числом итераций из текущего профиля
+    (settings.PASSWORD_HASHER_PROFILE).
+
+    Алгоритм тот же, что у стандартного хешера, поэтому старые хеши
+    проверяются как раньше, а хеши с меньшим числом итераций помечаются
+    к обновлению (must_update).
+    """
+
+    @property
+    def iterations(self):
+        return get_hasher_profile().get('ITERATIONS', DEFAULT_ITERATIONS)
+
+    def must_update(self, encoded):
+        # Только вверх: более дешёвый профиль (например, 'fast', выбранный
+        # переменной окружения) не должен ослаблять сохранённые хеши
+        if self.decode(encoded)['iterations'] > self.iterations:
+            return False
+        return super().must_update(encoded)
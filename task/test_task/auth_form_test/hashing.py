@@ -0,0 +1,132 @@
+# auth_form_test/hashing.py
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class HashingOverloaded(Exception):
+    pass
+
+
+class HashingPool:
+    """
+    Ограниченный пул потоков для PBKDF2.
+
+    hashlib.pbkdf2_hmac отпускает GIL, поэтому хеши считаются параллельно,
+    а event loop продолжает обслуживать другие запросы. Если в очереди уже
+    max_pending задач, новая отклоняется с HashingOverloaded.
+    """
+
+    def __init__(self, max_workers=4, max_pending=64):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='password-hashing',
+                    )
+        return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HashingOverloaded()
+            self._pending += 1
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, func, *args, **kwargs):
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), functools.partial(func, *args, **kwargs)
+            )
+        finally:
+            self._release()
+
+    def submit(self, func, *args, **kwargs):
+        # Фоновая задача без ожидания результата
+        self._acquire()
+        try:
+            future = self._get_executor().submit(func, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def _build_pool():
+    config = getattr(settings, 'PASSWORD_HASHING_POOL', {})
+    return HashingPool(
+        max_workers=config.get('MAX_WORKERS', 4),
+        max_pending=config.get('MAX_PENDING', 64),
+    )
+
+
+hashing_pool = _build_pool()
+
+
+def _upgrade_password(user_id, old_hash, raw_password):
+    from django.contrib.auth.hashers import make_password
+    from django.db import close_old_connections
+    from .models import AppUser
+
+    try:
+        # Пароль могли сменить, пока считался новый хеш — тогда ничего не пишем
+        AppUser.objects.filter(pk=user_id, password=old_hash).update(
+            password=make_password(raw_password)
+        )
+    finally:
+        close_old_connections()
+
+
+def schedule_password_upgrade(user, raw_password):
+    """Перехеширует пароль по текущему профилю, не задерживая ответ на вход."""
+    if not getattr(settings, 'PASSWORD_REHASH_IN_BACKGROUND', True):
+        _upgrade_password(user.pk, user.password, raw_password)
+        return
+    try:
+        hashing_pool.submit(_upgrade_password, user.pk, user.password, raw_password)
+    except HashingOverloaded:
+        # Не страшно: хеш обновится при следующем входе
+        pass
+
+
+def password_upgrade_setter(user):
+    return lambda raw_password: schedule_password_upgrade(user, raw_password)
+
+
+async def acheck_password(password, encoded, setter=None):
+    from django.contrib.auth.hashers import check_password
+
+    return await hashing_pool.run(check_password, password, encoded, setter)
+
+
+async def amake_password(password):
+    from django.contrib.auth.hashers import make_password
+
+    return await hashing_pool.run(make_password, password)
@@ -0,0 +1,131 @@
+# auth_form_test/maintenance.py
+import time
+
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .metrics import DEFAULT_LATENCY_BUCKETS, registry
+
+
+maintenance_deleted = registry.counter(
+    'auth_maintenance_deleted_total', 'Удалено устаревших записей', ('task',),
+)
+maintenance_batches = registry.counter(
+    'auth_maintenance_batches_total', 'Выполнено пакетов удаления', ('task',),
+)
+maintenance_backlog = registry.gauge(
+    'auth_maintenance_backlog', 'Устаревших записей осталось после прохода', ('task',),
+)
+maintenance_vacuum_pages = registry.counter(
+    'auth_maintenance_vacuum_pages_total', 'Страниц возвращено incremental_vacuum',
+)
+maintenance_last_run = registry.gauge(
+    'auth_maintenance_last_run_timestamp_seconds', 'Время окончания последнего прохода',
+)
+maintenance_cycle_seconds = registry.histogram(
+    'auth_maintenance_cycle_duration_seconds', 'Длительность прохода обслуживания',
+    buckets=DEFAULT_LATENCY_BUCKETS + (30.0, 60.0),
+)
+
+
+def expired_sessions(now):
+    from django.contrib.sessions.models import Session
+
+    return Session.objects.filter(expire_date__lt=now)
+
+
+def expired_revocations(now):
+    from .models import RevokedSession
+
+    return RevokedSession.objects.filter(expires_at__lte=now)
+
+
+def cleanup_tasks():
+    # Задача -> функция now -> QuerySet устаревших строк (по индексированному полю)
+    tasks = {'revoked_sessions': expired_revocations}
+    if apps.is_installed('django.contrib.sessions'):
+        tasks['sessions'] = expired_sessions
+    return tasks
+
+
+def delete_in_batches(task, queryset_for, batch_size=500, deadline=None, pause=0.0, using=DEFAULT_DB_ALIAS):
+    """
+    Удаляет строки пакетами по batch_size, каждый — в своей короткой
+    транзакции, чтобы блокировка записи не держалась долго. Между пакетами
+    пауза pause секунд. Останавливается по deadline (time.monotonic()).
+
+    Возвращает (удалено, всё ли удалено).
+    """
+    deleted = 0
+    while deadline is None or time.monotonic() < deadline:
+        queryset = queryset_for(timezone.now()).using(using)
+        with transaction.atomic(using=using):
+            pks = list(queryset.order_by().values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return deleted, True
+            count, _ = queryset.model._base_manager.using(using).filter(pk__in=pks).delete()
+        deleted += count
+        maintenance_deleted.inc(task, amount=count)
+        maintenance_batches.inc(task)
+        if len(pks) < batch_size:
+            return deleted, True
+        if pause:
+            time.sleep(pause)
+    return deleted, False
+
+
+def incremental_vacuum(pages, using=DEFAULT_DB_ALIAS):
+    """
+    Возвращает в ОС до pages свободных страниц.
+
+    Работает только при auto_vacuum = INCREMENTAL (см. sqlite.DEFAULT_PRAGMAS); для
+    существующей базы режим включается однократным VACUUM. Возвращает число
+    освобождённых страниц или None, если режим не включён.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum')
+        if cursor.fetchone()[0] != 2:
+            return None
+        cursor.execute('PRAGMA freelist_count')
+        before = cursor.fetchone()[0]
+        # sqlite3.Cursor.execute делает один sqlite3_step, а каждый шаг
+        # incremental_vacuum освобождает одну страницу
+        for _ in range(min(int(pages), before)):
+            cursor.execute('PRAGMA incremental_vacuum')
+        cursor.execute('PRAGMA freelist_count')
+        freed = before - cursor.fetchone()[0]
+    maintenance_vacuum_pages.inc(amount=freed)
+    return freed
+
+
+def optimize(using=DEFAULT_DB_ALIAS):
+    # Обновляет статистику планировщика только там, где она устарела
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA optimize')
+
+
+def run_cycle(batch_size=500, time_budget=2.0, pause=0.05, vacuum_pages=200, using=DEFAULT_DB_ALIAS):
+    """Один проход: очистка всех задач в пределах time_budget секунд, затем vacuum и optimize."""
+    started = time.monotonic()
+    deadline = started + time_budget
+    report = {}
+    for task, queryset_for in cleanup_tasks().items():
+        deleted, finished = delete_in_batches(task, queryset_for, batch_size, deadline, pause, using)
+        backlog = 0 if finished else queryset_for(timezone.now()).using(using).count()
+        maintenance_backlog.set(task, value=backlog)
+        report[task] = {'deleted': deleted, 'finished': finished, 'backlog': backlog}
+
+    report['vacuum_pages'] = incremental_vacuum(vacuum_pages, using) if vacuum_pages else None
+    optimize(using)
+
+    elapsed = time.monotonic() - started
+    report['seconds'] = round(elapsed, 3)
+    maintenance_cycle_seconds.observe(value=elapsed)
+    maintenance_last_run.set(value=time.time())
+    return report
@@ -0,0 +1,81 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auth_form_test.access_rules import (
+    PermissionMatrixError, apply_permission_matrix, clone_role, role_matrix,
+)
+from auth_form_test.models import Role
+
+
+def load_matrix(path):
+    with (sys.stdin if path == '-' else open(path, encoding='utf-8')) as stream:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise CommandError('Для YAML-файлов нужен пакет PyYAML (pip install pyyaml)')
+            data = yaml.safe_load(stream)
+        else:
+            data = json.load(stream)
+    if not isinstance(data, dict):
+        raise CommandError('Матрица должна быть объектом {роль: {код_объекта: права}}')
+    return data
+
+
+class Command(BaseCommand):
+    help = 'Массовое управление правилами доступа: apply, clone, export'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        apply_parser = subparsers.add_parser(
+            'apply', help='Применить матрицу прав из JSON/YAML {роль: {код_объекта: права}}'
+        )
+        apply_parser.add_argument('path', help="Файл матрицы или '-' для stdin (JSON)")
+        apply_parser.add_argument('--prune', action='store_true',
+                                  help='Удалить правила ролей из файла для объектов, которых в нём нет')
+        apply_parser.add_argument('--dry-run', action='store_true', help='Только показать изменения')
+
+        clone_parser = subparsers.add_parser('clone', help='Скопировать все правила роли в другую роль')
+        clone_parser.add_argument('source', help='Название исходной роли')
+        clone_parser.add_argument('target', help='Название новой роли')
+        clone_parser.add_argument('--description', default=None)
+
+        export_parser = subparsers.add_parser('export', help='Выгрузить матрицу прав в JSON')
+        export_parser.add_argument('roles', nargs='*', help='Роли (по умолчанию все)')
+
+    def handle(self, *args, **options):
+        try:
+            getattr(self, f"handle_{options['action']}")(options)
+        except PermissionMatrixError as e:
+            raise CommandError(str(e))
+
+    def _report(self, result, prefix=''):
+        changed = result['created'] + result['updated'] + result['deleted']
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Изменено правил: {changed} (создано {result['created']}, "
+            f"обновлено {result['updated']}, удалено {result['deleted']}, "
+            f"без изменений {result['unchanged']})"
+        ))
+
+    def handle_apply(self, options):
+        result = apply_permission_matrix(
+            load_matrix(options['path']), prune=options['prune'], dry_run=options['dry_run'],
+        )
+        self._report(result, prefix='[dry-run] ' if options['dry_run'] else '')
+
+    def handle_clone(self, options):
+        try:
+            role, result = clone_role(options['source'], options['target'], options['description'])
+        except Role.DoesNotExist:
+            raise CommandError(f"Роль {options['source']} не найдена")
+        self._report(result, prefix=f'Роль {role.name}: ')
+
+    def handle_export(self, options):
+        roles = Role.objects.order_by('name')
+        if options['roles']:
+            roles = roles.filter(name__in=options['roles'])
+        matrix = {role.name: role_matrix(role) for role in roles}
+        self.stdout.write(json.dumps(matrix, indent=2, ensure_ascii=False))
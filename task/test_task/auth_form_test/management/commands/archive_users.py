@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from auth_form_test import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит давно деактивированных пользователей из users в users_archive '
+        'пакетами, каждый — в своей транзакции'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90,
+                            help='Сколько дней аккаунт должен быть деактивирован')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--limit', type=int, help='Перенести не больше стольких пользователей')
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help='Пауза между пакетами, чтобы пропустить запись из запросов')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать кандидатов')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            cutoff = archive.archive_cutoff(options['days'])
+            count = archive.archive_candidates(cutoff, options['database']).count()
+            self.stdout.write(f'Кандидатов на архивацию: {count}')
+            return
+
+        archived = archive.archive_deactivated(
+            days=options['days'],
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+            pause=options['pause'],
+            using=options['database'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Перенесено в архив: {archived}'))
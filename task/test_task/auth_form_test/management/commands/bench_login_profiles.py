@@ -0,0 +1,71 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from auth_form_test.benchmarks import summarize
+from auth_form_test.forms import LoginForm
+from auth_form_test.hashers import get_hasher_profile
+from auth_form_test.models import AppUser
+
+
+BENCH_EMAIL = 'bench-login@example.com'
+BENCH_PASSWORD = 'bench-password-123'
+
+
+class Command(BaseCommand):
+    help = 'Замеряет задержку входа (LoginForm.is_valid) для каждого профиля хеширования'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', dest='profiles',
+                            help='Профиль из PASSWORD_HASHER_PROFILES (можно несколько раз)')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Количество входов на профиль')
+        parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+
+    def handle(self, *args, **options):
+        available = getattr(settings, 'PASSWORD_HASHER_PROFILES', {})
+        profiles = options['profiles'] or list(available)
+        unknown = [name for name in profiles if name not in available]
+        if unknown:
+            raise CommandError(f"Неизвестные профили: {', '.join(unknown)}")
+
+        results = {}
+        for name in profiles:
+            with override_settings(PASSWORD_HASHER_PROFILE=name):
+                results[name] = {
+                    'iterations': get_hasher_profile().get('ITERATIONS'),
+                    **self._measure(options['repeat']),
+                }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'profile':<14}{'iterations':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<14}{row['iterations']:>12}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}"
+            )
+
+    def _measure(self, repeat):
+        samples = []
+        # Тестовый пользователь не должен остаться в базе
+        with transaction.atomic():
+            AppUser.objects.create(
+                email=BENCH_EMAIL,
+                name='Bench',
+                last_name='Login',
+                password=make_password(BENCH_PASSWORD),
+            )
+            for _ in range(repeat):
+                form = LoginForm({'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+                started = time.perf_counter()
+                if not form.is_valid():
+                    raise CommandError(f'Вход не удался: {form.errors.as_text()}')
+                samples.append(time.perf_counter() - started)
+            transaction.set_rollback(True)
+        return summarize(samples)
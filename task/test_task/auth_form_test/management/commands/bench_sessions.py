@@ -0,0 +1,107 @@
+import contextlib
+import json
+import random
+import tempfile
+import time
+import uuid
+from importlib import import_module
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from auth_form_test import benchmarks
+from auth_form_test.models import AppUser
+
+
+# Вариант -> (SESSION_ENGINE, GENERATION_BACKEND или None — как в settings)
+ENGINES = {
+    'db': ('django.contrib.sessions.backends.db', None),
+    'signed': ('auth_form_test.session_store', None),
+    'signed+file-generation': ('auth_form_test.session_store', 'auth_form_test.generation.FileGenerationBackend'),
+}
+
+
+def session_payload():
+    # То же, что кладёт в сессию login_success
+    user = AppUser(id=uuid.uuid4(), email='bench-session@example.com', name='Bench')
+    return {
+        'user_id': str(user.id),
+        'user_email': user.email,
+        'user_name': user.name,
+        'jwt_token': user.generate_jwt_token(),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Накладные расходы сессии на один запрос (загрузка, чтение, при изменении — '
+        'сохранение) для БД-сессий и подписанных cookie'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engine', action='append', dest='engines', choices=sorted(ENGINES),
+                            help='Вариант (по умолчанию все)')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--write-ratio', type=float, default=0.1,
+                            help='Доля запросов, меняющих сессию')
+        parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+
+    def handle(self, *args, **options):
+        engines = options['engines'] or list(ENGINES)
+        with benchmarks.temporary_database():
+            results = {name: self._measure(name, options) for name in engines}
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{'engine':<24}{'p50 ms':>10}{'p95 ms':>10}{'q/req':>8}{'writes/req':>12}{'cookie B':>10}"
+        )
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<24}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['queries_per_request']:>8}"
+                f"{row['writes_per_request']:>12}{row['cookie_bytes']:>10}"
+            )
+
+    def _measure(self, name, options):
+        engine, generation_backend = ENGINES[name]
+        with contextlib.ExitStack() as stack:
+            overrides = {'SESSION_ENGINE': engine}
+            if generation_backend:
+                path = stack.enter_context(tempfile.TemporaryDirectory())
+                overrides['GENERATION_BACKEND'] = {'BACKEND': generation_backend, 'OPTIONS': {'path': path}}
+            stack.enter_context(override_settings(**overrides))
+            SessionStore = import_module(engine).SessionStore
+
+            store = SessionStore()
+            store.update(session_payload())
+            store.save()
+            session_key = store.session_key
+
+            rng = random.Random(0)
+            samples = []
+            with CaptureQueriesContext(connection) as queries:
+                for step in range(options['requests']):
+                    write = rng.random() < options['write_ratio']
+                    started = time.perf_counter()
+                    # Как SessionMiddleware и views: загрузка, чтение, сохранение при изменении
+                    store = SessionStore(session_key)
+                    store.get('user_id')
+                    if write:
+                        store['user_name'] = f'Bench {step}'
+                    if store.modified:
+                        store.save()
+                        session_key = store.session_key
+                    samples.append(time.perf_counter() - started)
+
+        requests = options['requests']
+        statements = [query['sql'].split(None, 1)[0].upper() for query in queries]
+        return {
+            'queries_per_request': round(len(statements) / requests, 2),
+            'writes_per_request': round(
+                sum(statement in ('INSERT', 'UPDATE', 'DELETE') for statement in statements) / requests, 2
+            ),
+            'cookie_bytes': len(session_key),
+            **benchmarks.summarize(samples),
+        }
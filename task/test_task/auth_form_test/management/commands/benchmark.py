@@ -0,0 +1,83 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from auth_form_test import benchmarks
+from auth_form_test.permissions import permission_matrix
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон login/register/dashboard/update_profile/check_permission '
+        'на отдельной временной базе; результат пишется в JSON и сравнивается с baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=sorted(benchmarks.SCENARIOS),
+                            help='Сценарий (по умолчанию все)')
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--roles', type=int, default=5)
+        parser.add_argument('--elements', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на сценарий')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--hasher-profile', default='fast',
+                            help='Профиль хеширования на время прогона (по умолчанию fast)')
+        parser.add_argument('--output', help='Куда записать результаты (JSON)')
+        parser.add_argument('--baseline', help='JSON с результатами предыдущего прогона')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Допустимое ухудшение относительно baseline (доля)')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'] or list(benchmarks.SCENARIOS)
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as fh:
+                baseline = json.load(fh)['results']
+
+        results = self._run(scenarios, options)
+        report = {
+            'config': {
+                key: options[key]
+                for key in ('users', 'roles', 'elements', 'requests', 'concurrency', 'hasher_profile')
+            },
+            'results': results,
+        }
+
+        self.stdout.write(f"{'scenario':<18}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'q/req':>8}{'err':>6}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<18}{row['throughput_rps']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+                f"{row['p99_ms']:>10}{row['queries_per_request']:>8}{row['errors']:>6}"
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump(report, fh, indent=2, ensure_ascii=False)
+
+        if baseline is not None:
+            regressions = benchmarks.compare(results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError('Регрессии относительно baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий относительно baseline нет'))
+
+    def _run(self, scenarios, options):
+        try:
+            with benchmarks.temporary_database(), override_settings(
+                DEBUG=False,
+                ALLOWED_HOSTS=['testserver'],
+                PASSWORD_HASHER_PROFILE=options['hasher_profile'],
+                PASSWORD_REHASH_IN_BACKGROUND=False,
+                # Сценарий login многократно входит одним пользователем
+                LOGIN_THROTTLE={'ENABLED': False},
+            ):
+                permission_matrix.invalidate()
+                data = benchmarks.seed(options['users'], options['roles'], options['elements'])
+                return {
+                    name: benchmarks.run_scenario(
+                        name, data, options['requests'], options['concurrency']
+                    )
+                    for name in scenarios
+                }
+        finally:
+            permission_matrix.invalidate()
@@ -0,0 +1,50 @@
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from auth_form_test.staticfiles import brotli
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает статику в STATIC_ROOT: минифицирует CSS, добавляет хеш в имена, '
+        'пишет manifest и предсжатые .gz/.br'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-clear', action='store_true',
+                            help='Не очищать STATIC_ROOT перед сборкой')
+
+    def handle(self, *args, **options):
+        storages = {**settings.STORAGES, 'staticfiles': settings.STATIC_PIPELINE_STORAGE}
+        with override_settings(STORAGES=storages):
+            from django.contrib.staticfiles.storage import staticfiles_storage
+
+            call_command('collectstatic', interactive=False, clear=not options['no_clear'],
+                         verbosity=0, stdout=self.stdout)
+            hashed_files = dict(staticfiles_storage.hashed_files)
+
+        if brotli is None:
+            self.stdout.write(self.style.WARNING('brotli не установлен: .br не созданы (pip install brotli)'))
+
+        css = sorted(
+            (name, hashed_name) for name, hashed_name in hashed_files.items()
+            if name.startswith('auth_form_test/') and name.endswith('.css')
+        )
+        width = max((len(hashed_name) for _, hashed_name in css), default=4) + 2
+        self.stdout.write(f"{'file':<{width}}{'source':>9}{'min':>9}{'gzip':>9}{'br':>9}")
+        for name, hashed_name in css:
+            hashed_path = os.path.join(settings.STATIC_ROOT, hashed_name)
+            sizes = [
+                os.path.getsize(finders.find(name)),
+                os.path.getsize(hashed_path),
+                *(self._size(hashed_path + suffix) for suffix in ('.gz', '.br')),
+            ]
+            self.stdout.write(f'{hashed_name:<{width}}' + ''.join(f'{size:>9}' for size in sizes))
+
+    def _size(self, path):
+        return os.path.getsize(path) if os.path.exists(path) else '-'
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from auth_form_test.bulk_users import detect_format, export_rows, write_rows
+from auth_form_test.models import AppUser
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка пользователей в CSV/JSONL (формат совместим с import_users)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help="Файл или '-' для stdout")
+        parser.add_argument('--format', choices=('csv', 'jsonl'))
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--active-only', action='store_true')
+        parser.add_argument('--with-password-hash', action='store_true',
+                            help='Выгрузить хеши паролей (для переноса между базами)')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = detect_format(output, options['format'])
+        queryset = AppUser.active.all() if options['active_only'] else AppUser.objects.all()
+
+        rows = export_rows(
+            queryset,
+            chunk_size=options['chunk_size'],
+            include_password_hash=options['with_password_hash'],
+        )
+        if output == '-':
+            count = write_rows(self.stdout, rows, fmt, options['with_password_hash'])
+        else:
+            with open(output, 'w', encoding='utf-8', newline='') as stream:
+                count = write_rows(stream, rows, fmt, options['with_password_hash'])
+            self.stdout.write(self.style.SUCCESS(f'Выгружено пользователей: {count}'))
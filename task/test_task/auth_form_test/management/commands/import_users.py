@@ -0,0 +1,48 @@
+import contextlib
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auth_form_test.bulk_users import UserImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковый импорт пользователей из CSV/JSONL. Поля: email, name, last_name, '
+        'password или password_hash, необязательные isActive и role (название роли)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл для импорта или '-' для stdin")
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help='Формат (по умолчанию по расширению файла)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Процессов для хеширования (0 — хешировать в текущем процессе)')
+        parser.add_argument('--dry-run', action='store_true', help='Проверить данные без записи')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = detect_format(path, options['format'])
+        if path == '-':
+            # stdin открыт не нами — после импорта его не закрываем
+            stream = contextlib.nullcontext(sys.stdin)
+        else:
+            try:
+                stream = open(path, encoding='utf-8', newline='')
+            except OSError as e:
+                raise CommandError(f'Не удалось открыть {path}: {e}')
+
+        with stream as source, UserImporter(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            dry_run=options['dry_run'],
+        ) as importer:
+            importer.run(read_rows(source, fmt))
+
+        for error in importer.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {importer.created}, пропущено (email уже есть): {importer.skipped}, '
+            f'ошибок: {len(importer.errors)}'
+        ))
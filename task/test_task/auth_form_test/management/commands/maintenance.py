@@ -0,0 +1,90 @@
+import json
+import signal
+import threading
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+
+from auth_form_test import maintenance
+from auth_form_test.metrics import registry
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+def metrics_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')])
+    return [registry.render().encode('utf-8')]
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет истёкшие сессии и записи об отзыве небольшими пакетами в пределах '
+        'бюджета времени, затем incremental_vacuum и PRAGMA optimize. '
+        'С --daemon повторяет проход каждые --interval секунд'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--daemon', action='store_true', help='Работать постоянно')
+        parser.add_argument('--interval', type=float, default=300, help='Секунд между проходами')
+        parser.add_argument('--batch-size', type=int, default=500, help='Строк в одном пакете удаления')
+        parser.add_argument('--time-budget', type=float, default=2.0,
+                            help='Секунд на удаление за один проход')
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help='Пауза между пакетами, чтобы пропустить запись из запросов')
+        parser.add_argument('--vacuum-pages', type=int, default=200,
+                            help='Страниц incremental_vacuum за проход (0 — не выполнять)')
+        parser.add_argument('--metrics-port', type=int,
+                            help='Отдавать метрики Prometheus на этом порту (127.0.0.1)')
+        parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                            help='Однократно перевести базу в auto_vacuum=INCREMENTAL (полный VACUUM, '
+                                 'выполнять вне пиковой нагрузки)')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if options['enable_incremental_vacuum']:
+            self._enable_incremental_vacuum(options['database'])
+            return
+
+        if options['metrics_port']:
+            server = make_server('127.0.0.1', options['metrics_port'], metrics_app, handler_class=QuietHandler)
+            threading.Thread(target=server.serve_forever, name='maintenance-metrics', daemon=True).start()
+
+        stop = threading.Event()
+        if options['daemon']:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: stop.set())
+
+        while True:
+            report = maintenance.run_cycle(
+                batch_size=options['batch_size'],
+                time_budget=options['time_budget'],
+                pause=options['pause'],
+                vacuum_pages=options['vacuum_pages'],
+                using=options['database'],
+            )
+            self.stdout.write(json.dumps(report, ensure_ascii=False))
+            if not options['daemon']:
+                break
+            # Соединение не держим открытым между проходами
+            close_old_connections()
+            connections[options['database']].close()
+            if stop.wait(options['interval']):
+                break
+
+    def _enable_incremental_vacuum(self, using):
+        connection = connections[using]
+        if connection.vendor != 'sqlite':
+            raise CommandError('incremental_vacuum есть только у SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            cursor.execute('VACUUM')
+            cursor.execute('PRAGMA auto_vacuum')
+            mode = cursor.fetchone()[0]
+        if mode != 2:
+            raise CommandError(f'auto_vacuum не переключился (сейчас {mode})')
+        self.stdout.write(self.style.SUCCESS('auto_vacuum = INCREMENTAL'))
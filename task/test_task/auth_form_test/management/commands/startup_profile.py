@@ -0,0 +1,95 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from auth_form_test import benchmarks
+
+
+# Варианты конфигурации: переменные окружения поверх текущих
+CONFIGS = {
+    'default': {},
+    'slim': {'DJANGO_SLIM_APPS': '1'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Профиль импортов (-X importtime) и время холодного старта воркера '
+        'до первого обслуженного запроса для обычной и облегчённой конфигурации'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--config', action='append', dest='configs', choices=sorted(CONFIGS),
+                            help='Конфигурация (по умолчанию все)')
+        parser.add_argument('--path', default='/login/', help='Первый запрос после старта')
+        parser.add_argument('--runs', type=int, default=5, help='Запусков на конфигурацию')
+        parser.add_argument('--top', type=int, default=15, help='Сколько пакетов и модулей показать')
+        parser.add_argument('--output', help='Куда записать результаты (JSON)')
+        parser.add_argument('--baseline', help='JSON с результатами предыдущего прогона')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Допустимое ухудшение относительно baseline (доля)')
+
+    def handle(self, *args, **options):
+        configs = options['configs'] or list(CONFIGS)
+        fd, db_path = tempfile.mkstemp(suffix='.sqlite3', prefix='auth-boot-')
+        os.close(fd)
+        try:
+            base_env = {
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'test_task.settings'),
+                'DJANGO_DATABASE_PATH': db_path,
+            }
+            self._migrate(base_env)
+            report = {
+                name: self._profile({**base_env, **CONFIGS[name]}, options)
+                for name in configs
+            }
+        finally:
+            for path in (db_path, f'{db_path}-wal', f'{db_path}-shm'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        for name, row in report.items():
+            imports = row['imports']
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name}: старт до первого ответа p50 {row['boot']['p50_ms']} мс, "
+                f"p95 {row['boot']['p95_ms']} мс; импортов {imports['modules']}, "
+                f"{imports['total_ms']} мс"
+            ))
+            for package, ms in imports['packages_ms'].items():
+                self.stdout.write(f'  {package:<40}{ms:>10} мс')
+
+        boot = {name: row['boot'] for name, row in report.items()}
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump({'config': {'path': options['path']}, 'results': boot, 'profiles': report},
+                          fh, indent=2, ensure_ascii=False)
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as fh:
+                baseline = json.load(fh)['results']
+            regressions = benchmarks.compare(boot, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError('Регрессии относительно baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий относительно baseline нет'))
+
+    def _migrate(self, env):
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'migrate', '--verbosity', '0'],
+            env=env, cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'migrate завершился с ошибкой:\n{result.stderr}')
+
+    def _profile(self, env, options):
+        _, ok, stderr = benchmarks.run_boot(options['path'], env, settings.BASE_DIR, importtime=True)
+        if not ok:
+            raise CommandError(f"Запрос {options['path']} после старта не удался:\n{stderr[-2000:]}")
+        return {
+            'boot': benchmarks.measure_boot(options['path'], env, settings.BASE_DIR, options['runs']),
+            'imports': benchmarks.summarize_imports(benchmarks.parse_importtime(stderr), options['top']),
+        }
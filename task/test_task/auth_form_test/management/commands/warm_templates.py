@@ -0,0 +1,92 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from auth_form_test.benchmarks import summarize
+from auth_form_test.forms import LoginForm, UserRegistrationForm, UserUpdateForm
+from auth_form_test.models import AppUser
+from auth_form_test.template_cache import (
+    build_engine, django_engines, iter_template_names, uses_cached_loader, warm_templates,
+)
+
+
+def view_templates():
+    # view -> (шаблон, контекст), как их рендерят views.py; без запросов к БД
+    user = AppUser(email='bench@example.com', name='Bench', last_name='Render')
+    return {
+        'index': ('auth_form_test/index.html', {}),
+        'about': ('auth_form_test/register.html', {}),
+        'login': ('auth_form_test/login.html', {'form': LoginForm()}),
+        'register': ('auth_form_test/register.html', {'form': UserRegistrationForm()}),
+        'dashboard': ('auth_form_test/dahboard.html', {'user': user}),
+        'update_profile': ('auth_form_test/change_user_data.html', {
+            'form': UserUpdateForm(user=user), 'user': user,
+        }),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет и компилирует все шаблоны auth_form_test; '
+        'с --benchmark сравнивает время рендера по view без кэша и с предкомпиляцией'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--benchmark', action='store_true',
+                            help='Замерить рендер каждого view без кэша и с предкомпиляцией')
+        parser.add_argument('--repeat', type=int, default=200, help='Рендеров на view')
+        parser.add_argument('--json', action='store_true', help='Вывести замеры в JSON')
+
+    def handle(self, *args, **options):
+        names = list(iter_template_names())
+        started = time.perf_counter()
+        errors = warm_templates(names)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        for name, error in errors.items():
+            self.stderr.write(f'{name}: {error}')
+        if errors:
+            raise CommandError(f'Шаблонов с ошибками: {len(errors)}')
+
+        cached = all(uses_cached_loader(engine) for engine in django_engines())
+        self.stdout.write(self.style.SUCCESS(
+            f'Скомпилировано шаблонов: {len(names)} за {elapsed_ms:.1f} мс'
+        ))
+        if not cached:
+            self.stdout.write(self.style.WARNING(
+                'Кэширующий загрузчик не включён явно: для предкомпиляции при старте '
+                'запустите воркер с DJANGO_TEMPLATE_MODE=production'
+            ))
+
+        if options['benchmark']:
+            self._benchmark(options['repeat'], options['json'])
+
+    def _benchmark(self, repeat, as_json):
+        request = RequestFactory().get('/')
+        engines = {'uncached': build_engine(False), 'precompiled': build_engine(True)}
+        warm = engines['precompiled']
+        for template_name, _ in view_templates().values():
+            warm.get_template(template_name)
+
+        results = {}
+        for view, (template_name, context) in view_templates().items():
+            results[view] = {}
+            for label, engine in engines.items():
+                samples = []
+                for _ in range(repeat):
+                    # Как render(): поиск шаблона + рендер на каждый запрос
+                    begin = time.perf_counter()
+                    engine.get_template(template_name).render(context, request)
+                    samples.append(time.perf_counter() - begin)
+                results[view][label] = summarize(samples)
+
+        if as_json:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'view':<16}{'uncached p50':>14}{'precompiled p50':>17}{'speedup':>10}")
+        for view, row in results.items():
+            before, after = row['uncached']['p50_ms'], row['precompiled']['p50_ms']
+            speedup = f'{before / after:.1f}x' if after else '-'
+            self.stdout.write(f'{view:<16}{before:>14}{after:>17}{speedup:>10}')
@@ -0,0 +1,274 @@
+# auth_form_test/metrics.py
+import bisect
+import contextvars
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def samples(self):
+        for labels, value in self.items():
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, *labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self._series.items()]
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield (
+                    f'{self.name}_bucket',
+                    _format_labels(self.labelnames, labels, [('le', _format_value(float(bound)))]),
+                    cumulative,
+                )
+            yield f'{self.name}_sum', _format_labels(self.labelnames, labels), total
+            yield f'{self.name}_count', _format_labels(self.labelnames, labels), count
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def register_collector(self, collector):
+        # collector() -> iterable метрик, вычисляемых в момент выгрузки
+        self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        lines = []
+        metrics = list(self._metrics)
+        for collector in self._collectors:
+            metrics.extend(collector())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+request_latency = registry.histogram(
+    'auth_request_duration_seconds', 'Время обработки запроса', ('view',),
+)
+request_queries = registry.histogram(
+    'auth_request_sql_queries', 'Количество SQL-запросов на запрос', ('view',),
+    buckets=DEFAULT_QUERY_BUCKETS,
+)
+sql_queries_total = registry.counter(
+    'auth_sql_queries_total', 'Всего SQL-запросов', ('view',),
+)
+sql_seconds_total = registry.counter(
+    'auth_sql_duration_seconds_total', 'Суммарное время SQL-запросов', ('view',),
+)
+
+
+@registry.register_collector
+def token_cache_metrics():
+    from .token_cache import token_cache
+
+    stats = token_cache.stats()
+    gauge = Gauge('auth_jwt_cache_entries', 'Размер кэша проверенных JWT')
+    gauge.set(value=stats['size'])
+    events = Counter('auth_jwt_cache_events_total', 'События кэша проверенных JWT', ('event',))
+    for event in ('hits', 'misses', 'evictions', 'expirations', 'revocations'):
+        events.inc(event, amount=stats[event])
+    return [gauge, events]
+
+
+class QueryRecorder:
+    """Счётчик запросов и времени SQL в рамках одного HTTP-запроса."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# Запись текущего HTTP-запроса. Контекст копируется в потоки sync_to_async,
+# а у каждого потока свои соединения — поэтому обёртка стоит на всех
+# соединениях постоянно и берёт запись отсюда
+_current_recorder = contextvars.ContextVar('query_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.duration += time.perf_counter() - started
+        recorder.count += 1
+
+
+def install_query_recorder(connection):
+    # Вызывается для каждого нового соединения (signals.connection_created)
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def get_metrics_settings():
+    return {
+        'SAMPLE_RATE': 1.0,
+        'ALLOWED_IPS': ('127.0.0.1', '::1'),
+        **getattr(settings, 'METRICS', {}),
+    }
+
+
+class MetricsMiddleware:
+    """
+    Гистограммы задержки, число SQL-запросов и время SQL по имени URL.
+
+    При SAMPLE_RATE = 0 запросы не измеряются; при дробном значении
+    измеряется только соответствующая доля. SQL считается и в потоках
+    sync_to_async: запись передаётся через contextvar.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = get_metrics_settings()['SAMPLE_RATE']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return self.sample_rate >= 1 or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+
+        # Соединения, открытые до подключения сигнала (например, при старте)
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        self._record(request, recorder, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        self._record(request, recorder, time.perf_counter() - started)
+        return response
+
+    def _record(self, request, recorder, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name if match else None) or 'unresolved'
+        request_latency.observe(view, value=elapsed)
+        request_queries.observe(view, value=recorder.count)
+        sql_queries_total.inc(view, amount=recorder.count)
+        sql_seconds_total.inc(view, amount=recorder.duration)
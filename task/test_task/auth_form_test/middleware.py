@@ -0,0 +1,29 @@
+# auth_form_test/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from .generation import current_generation
+from .permissions import ACL_GENERATION, permission_matrix
+
+
+class AclGenerationMiddleware:
+    """Сбрасывает матрицу прав, если правила изменились в другом воркере."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        permission_matrix.sync(current_generation(ACL_GENERATION))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Счётчик поколений может читаться из БД
+        generation = await sync_to_async(current_generation)(ACL_GENERATION)
+        permission_matrix.sync(generation)
+        return await self.get_response(request)
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_form_test', '0002_businesselement_role_appuser_role_accessrule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Счётчик')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Поколение')),
+            ],
+            options={
+                'verbose_name': 'Счётчик поколений',
+                'verbose_name_plural': 'Счётчики поколений',
+                'db_table': 'generation_counters',
+            },
+        ),
+    ]
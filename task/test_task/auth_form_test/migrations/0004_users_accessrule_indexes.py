@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_form_test', '0003_generationcounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accessrule',
+            index=models.Index(fields=['role', 'element', 'can_read', 'can_create', 'can_update', 'can_delete', 'can_read_all', 'can_update_all', 'can_delete_all'], name='accessrule_role_perm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appuser',
+            index=models.Index(condition=models.Q(('isActive', True)), fields=['email'], name='users_active_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appuser',
+            index=models.Index(fields=['-date_reg'], name='users_date_reg_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_form_test', '0004_users_accessrule_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedSession',
+            fields=[
+                ('sid', models.CharField(max_length=32, primary_key=True, serialize=False, verbose_name='ID сессии')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Действует до')),
+            ],
+            options={
+                'verbose_name': 'Отозванная сессия',
+                'verbose_name_plural': 'Отозванные сессии',
+                'db_table': 'revoked_sessions',
+            },
+        ),
+    ]
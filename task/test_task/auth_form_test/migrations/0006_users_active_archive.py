@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_deactivated_at(apps, schema_editor):
+    # Уже деактивированные аккаунты считаем деактивированными в момент миграции
+    AppUser = apps.get_model('auth_form_test', 'AppUser')
+    AppUser.objects.using(schema_editor.connection.alias).filter(
+        isActive=False, deactivated_at__isnull=True
+    ).update(deactivated_at=django.utils.timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_form_test', '0005_revokedsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedUser',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(db_index=True, max_length=255, verbose_name='Email')),
+                ('name', models.CharField(max_length=100, verbose_name='Имя')),
+                ('last_name', models.CharField(max_length=100, verbose_name='Фамилия')),
+                ('password', models.CharField(max_length=255, verbose_name='Пароль')),
+                ('date_reg', models.DateTimeField(verbose_name='Дата регистрации')),
+                ('deactivated_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата деактивации')),
+                ('role_name', models.CharField(blank=True, max_length=50, verbose_name='Роль на момент архивации')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата архивации')),
+            ],
+            options={
+                'verbose_name': 'Архивный пользователь',
+                'verbose_name_plural': 'Архивные пользователи',
+                'db_table': 'users_archive',
+            },
+        ),
+        migrations.AddField(
+            model_name='appuser',
+            name='deactivated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата деактивации'),
+        ),
+        migrations.AddIndex(
+            model_name='appuser',
+            index=models.Index(condition=models.Q(('isActive', False)), fields=['deactivated_at'], name='users_deactivated_at_idx'),
+        ),
+        migrations.RunPython(backfill_deactivated_at, migrations.RunPython.noop),
+    ]
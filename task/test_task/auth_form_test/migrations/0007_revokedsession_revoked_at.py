@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_form_test', '0006_users_active_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='revokedsession',
+            name='revoked_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Отозвана'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_form_test', '0007_revokedsession_revoked_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appuser',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения'),
+        ),
+    ]
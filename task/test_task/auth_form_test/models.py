@@ -2,10 +2,12 @@
 from django.db import models
 from django.utils import timezone
 import uuid
-import jwt
 import datetime
 from django.conf import settings
 
+from .authentication import get_signing_key, JWT_ALGORITHM
+from .permissions import FLAG_FIELDS as PERMISSION_FIELDS, PERMISSION_BITS, permission_matrix, unpack_mask
+
 
 class Role(models.Model):
 
@@ -65,11 +67,24 @@ class AccessRule(models.Model):
         verbose_name_plural = 'Правила доступа'
         unique_together = ['role', 'element']
         ordering = ['role', 'element']
+        indexes = [
+            # Покрывающий индекс: права роли читаются без обращения к таблице
+            models.Index(
+                fields=['role', 'element', *PERMISSION_FIELDS],
+                name='accessrule_role_perm_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.role.name} -> {self.element.name}"
 
 
+class ActiveUserManager(models.Manager):
+    # Деактивированные строки отсекаются в SQL (частичные индексы WHERE "isActive")
+
+    def get_queryset(self):
+        return super().get_queryset().filter(isActive=True)
+
 
 class AppUser(models.Model):
     id = models.UUIDField(
@@ -103,6 +118,18 @@ class AppUser(models.Model):
         verbose_name='Дата регистрации',
         default=timezone.now
     )
+    deactivated_at = models.DateTimeField(
+        verbose_name='Дата деактивации',
+        null=True,
+        blank=True
+    )
+    # По нему воркеры догружают в фильтр email только новые и изменённые
+    # адреса (см. email_index.py)
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
 
     # Новое поле для роли
     role = models.ForeignKey(
@@ -113,25 +140,62 @@ class AppUser(models.Model):
         verbose_name='Роль пользователя'
     )
 
+    # objects остаётся менеджером по умолчанию: уникальность email, админка
+    # и выгрузка должны видеть и деактивированные аккаунты
+    objects = models.Manager()
+    active = ActiveUserManager()
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ['-date_reg']
         db_table = 'users'
+        indexes = [
+            # Частичный индекс только по активным аккаунтам
+            models.Index(
+                fields=['email'],
+                condition=models.Q(isActive=True),
+                name='users_active_email_idx',
+            ),
+            # Сортировка по умолчанию (-date_reg) без временного B-дерева
+            models.Index(fields=['-date_reg'], name='users_date_reg_idx'),
+            # Кандидаты на перенос в архив (archive_users)
+            models.Index(
+                fields=['deactivated_at'],
+                condition=models.Q(isActive=False),
+                name='users_deactivated_at_idx',
+            ),
+        ]
+
+    # {element_code: маска} прав роли, если пользователь загружен через
+    # request_user.load_user; иначе права читаются из общей матрицы
+    preloaded_masks = None
 
     def __str__(self):
         return f"{self.email} ({self.name} {self.last_name})"
 
+    def save(self, *args, **kwargs):
+        # auto_now не попадает в update_fields сам: без updated_at
+        # смену email не увидят другие воркеры
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
+
     def generate_jwt_token(self):
+        # jwt импортируется при первом входе, а не при старте воркера
+        import jwt
 
         payload = {
             'user_id': str(self.id),
             'email': self.email,
+            # Идентификатор для общего списка отзыва (revoked_sessions)
+            'jti': uuid.uuid4().hex,
             'exp': datetime.datetime.utcnow() + datetime.timedelta(days=7),
             'iat': datetime.datetime.utcnow()
         }
 
-        token = jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+        token = jwt.encode(payload, get_signing_key(), algorithm=JWT_ALGORITHM)
 
         if isinstance(token, bytes):
             token = token.decode('utf-8')
@@ -139,28 +203,88 @@ class AppUser(models.Model):
 
     def check_permission(self, element_code, permission_type):
 
-        if not self.role or not self.isActive:
+        if not self.role_id or not self.isActive:
             return False
 
-        try:
-            element = BusinessElement.objects.get(code=element_code)
-            rule = AccessRule.objects.get(role=self.role, element=element)
-
-            if permission_type == 'read':
-                return rule.can_read
-            elif permission_type == 'create':
-                return rule.can_create
-            elif permission_type == 'update':
-                return rule.can_update
-            elif permission_type == 'delete':
-                return rule.can_delete
-            elif permission_type == 'read_all':
-                return rule.can_read_all
-            elif permission_type == 'update_all':
-                return rule.can_update_all
-            elif permission_type == 'delete_all':
-                return rule.can_delete_all
-            else:
-                return False
-        except (BusinessElement.DoesNotExist, AccessRule.DoesNotExist):
-            return False
\ No newline at end of file
+        if self.preloaded_masks is not None:
+            bit = PERMISSION_BITS.get(permission_type, 0)
+            return bool(self.preloaded_masks.get(element_code, 0) & bit)
+        return permission_matrix.has_permission(self.role_id, element_code, permission_type)
+
+    def check_permissions(self, pairs):
+        # pairs: [(element_code, permission_type), ...] -> {(element_code, permission_type): bool}
+        pairs = list(pairs)
+        if not self.role_id or not self.isActive:
+            return {pair: False for pair in pairs}
+
+        if self.preloaded_masks is not None:
+            return {
+                (element_code, permission_type): bool(
+                    self.preloaded_masks.get(element_code, 0) & PERMISSION_BITS.get(permission_type, 0)
+                )
+                for element_code, permission_type in pairs
+            }
+        return permission_matrix.check_many(self.role_id, pairs)
+
+    def permission_table(self, element_codes=None):
+        # {element_code: {permission_type: bool}} — удобно читать из шаблона
+        if not self.role_id or not self.isActive:
+            masks = {}
+        elif self.preloaded_masks is not None:
+            masks = self.preloaded_masks
+        else:
+            masks = permission_matrix.role_masks(self.role_id)
+        if element_codes is None:
+            element_codes = sorted(masks)
+        return {code: unpack_mask(masks.get(code, 0)) for code in element_codes}
+
+
+class GenerationCounter(models.Model):
+    # Общий для всех воркеров счётчик изменений (например, правил доступа)
+    name = models.CharField(primary_key=True, max_length=50, verbose_name='Счётчик')
+    value = models.BigIntegerField(default=0, verbose_name='Поколение')
+
+    class Meta:
+        verbose_name = 'Счётчик поколений'
+        verbose_name_plural = 'Счётчики поколений'
+        db_table = 'generation_counters'
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class RevokedSession(models.Model):
+    # Отозванные сессии из подписанных cookie (см. session_store.py) и JWT
+    # (по jti, см. authentication.py); строка нужна только до истечения
+    # срока жизни cookie или токена
+    sid = models.CharField(primary_key=True, max_length=32, verbose_name='ID сессии')
+    expires_at = models.DateTimeField(db_index=True, verbose_name='Действует до')
+    # По нему воркеры догружают только новые отзывы (RevocationList.sync)
+    revoked_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name='Отозвана')
+
+    class Meta:
+        verbose_name = 'Отозванная сессия'
+        verbose_name_plural = 'Отозванные сессии'
+        db_table = 'revoked_sessions'
+
+
+class ArchivedUser(models.Model):
+    # Холодная копия давно деактивированного пользователя (см. archive.py).
+    # Email не уникален: адрес можно зарегистрировать заново
+    id = models.UUIDField(primary_key=True, editable=False, verbose_name='ID')
+    email = models.EmailField(max_length=255, db_index=True, verbose_name='Email')
+    name = models.CharField(max_length=100, verbose_name='Имя')
+    last_name = models.CharField(max_length=100, verbose_name='Фамилия')
+    password = models.CharField(max_length=255, verbose_name='Пароль')
+    date_reg = models.DateTimeField(verbose_name='Дата регистрации')
+    deactivated_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата деактивации')
+    role_name = models.CharField(max_length=50, blank=True, verbose_name='Роль на момент архивации')
+    archived_at = models.DateTimeField(default=timezone.now, verbose_name='Дата архивации')
+
+    class Meta:
+        verbose_name = 'Архивный пользователь'
+        verbose_name_plural = 'Архивные пользователи'
+        db_table = 'users_archive'
+
+    def __str__(self):
+        return f"{self.email} ({self.name} {self.last_name})"
@@ -0,0 +1,106 @@
+# auth_form_test/page_cache.py
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.cache import patch_vary_headers
+
+from .authentication import JWT_COOKIE_NAME
+from .metrics import Gauge, registry
+
+
+# Подставляется вместо {% csrf_token %} при рендере; в кэше лежит только он,
+# а настоящий токен вставляется в каждый ответ заново
+CSRF_PLACEHOLDER = 'csrf0page0cache0placeholder'
+
+page_cache_requests = registry.counter(
+    'auth_page_cache_requests_total', 'Обращения к кэшу страниц', ('view', 'result'),
+)
+
+
+@registry.register_collector
+def page_cache_metrics():
+    ratio = Gauge('auth_page_cache_hit_ratio', 'Доля попаданий в кэш страниц', ('view',))
+    totals = {}
+    for (view, result), value in page_cache_requests.items():
+        totals.setdefault(view, {})[result] = value
+    for view, counts in totals.items():
+        lookups = counts.get('hit', 0) + counts.get('miss', 0)
+        if lookups:
+            ratio.set(view, value=counts.get('hit', 0) / lookups)
+    return [ratio]
+
+
+def get_page_cache_settings():
+    return {
+        'ENABLED': True,
+        'ALIAS': 'default',
+        'TIMEOUT': 300,
+        **getattr(settings, 'PAGE_CACHE', {}),
+    }
+
+
+def _auth_variant(request):
+    # Анонимы делят одну запись, у клиента с сессией или JWT — своя
+    cookies = [request.COOKIES.get(name, '') for name in (settings.SESSION_COOKIE_NAME, JWT_COOKIE_NAME)]
+    if not any(cookies):
+        return 'anon'
+    return hashlib.sha256('\0'.join(cookies).encode()).hexdigest()[:32]
+
+
+def page_cache_key(request, template_name):
+    # Путь в ключе: один шаблон может отдаваться разными view (about и register)
+    return 'page:{}:{}:{}:{}'.format(
+        request.path, template_name, translation.get_language() or '', _auth_variant(request),
+    )
+
+
+def _cacheable(request):
+    # Сообщения выводятся один раз — такую страницу надо рендерить заново
+    return request.method in ('GET', 'HEAD') and not len(get_messages(request))
+
+
+def render_cached(request, template_name, context=None):
+    """
+    render() с кэшированием готового HTML.
+
+    context может быть функцией: тогда форма и прочий контекст создаются
+    только при промахе. CSRF-токен в кэш не попадает — вместо него
+    хранится CSRF_PLACEHOLDER, который заменяется токеном текущего запроса.
+    """
+    config = get_page_cache_settings()
+    match = getattr(request, 'resolver_match', None)
+    view = (match.url_name if match else None) or template_name
+    if not config['ENABLED'] or not _cacheable(request):
+        page_cache_requests.inc(view, 'bypass')
+        return render(request, template_name, _resolve(context))
+
+    cache = caches[config['ALIAS']]
+    key = page_cache_key(request, template_name)
+    content = cache.get(key)
+    if content is None:
+        page_cache_requests.inc(view, 'miss')
+        content = render_to_string(
+            template_name, {**_resolve(context), 'csrf_token': CSRF_PLACEHOLDER}, request,
+        )
+        cache.set(key, content, config['TIMEOUT'])
+    else:
+        page_cache_requests.inc(view, 'hit')
+
+    if CSRF_PLACEHOLDER in content:
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+    response = HttpResponse(content)
+    patch_vary_headers(response, ('Cookie', 'Accept-Language'))
+    return response
+
+
+def _resolve(context):
+    if callable(context):
+        return context()
+    return context or {}
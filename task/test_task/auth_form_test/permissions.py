@@ -0,0 +1,165 @@
+# auth_form_test/permissions.py
+import threading
+
+from django.db import DEFAULT_DB_ALIAS
+
+
+# Имя счётчика поколений, который меняется при любом изменении правил
+ACL_GENERATION = 'acl'
+
+# Порядок флагов задаёт номер бита в маске
+PERMISSION_FLAGS = (
+    ('read', 'can_read'),
+    ('create', 'can_create'),
+    ('update', 'can_update'),
+    ('delete', 'can_delete'),
+    ('read_all', 'can_read_all'),
+    ('update_all', 'can_update_all'),
+    ('delete_all', 'can_delete_all'),
+)
+
+PERMISSION_BITS = {
+    permission_type: 1 << index
+    for index, (permission_type, _) in enumerate(PERMISSION_FLAGS)
+}
+
+FLAG_FIELDS = tuple(field for _, field in PERMISSION_FLAGS)
+
+
+def pack_flags(values):
+    mask = 0
+    for index, value in enumerate(values):
+        if value:
+            mask |= 1 << index
+    return mask
+
+
+def rule_mask(rule):
+    return pack_flags(getattr(rule, field) for field in FLAG_FIELDS)
+
+
+def unpack_mask(mask):
+    return {
+        permission_type: bool(mask & bit)
+        for permission_type, bit in PERMISSION_BITS.items()
+    }
+
+
+class PermissionMatrix:
+    """
+    Скомпилированная матрица прав: (role_id, element_code) -> битовая маска.
+
+    Загружается одним запросом при первом обращении и живёт в памяти
+    процесса; сигналы моделей патчат или сбрасывают её при изменениях.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._masks = None
+        self._element_codes = {}
+        self._rule_keys = {}
+        self._generation = None
+
+    def _load(self):
+        from .models import AccessRule
+
+        # Матрица привязана к поколению, прочитанному с основной базы,
+        # поэтому и сами правила читаем оттуда, а не с отстающей реплики
+        rows = (
+            AccessRule.objects
+            .using(DEFAULT_DB_ALIAS)
+            .order_by()
+            .values_list('id', 'role_id', 'element_id', 'element__code', *FLAG_FIELDS)
+        )
+        masks = {}
+        element_codes = {}
+        rule_keys = {}
+        for rule_id, role_id, element_id, code, *flags in rows:
+            masks[(role_id, code)] = pack_flags(flags)
+            element_codes[element_id] = code
+            rule_keys[rule_id] = (role_id, code)
+        return masks, element_codes, rule_keys
+
+    def _ensure_loaded(self):
+        masks = self._masks
+        if masks is not None:
+            return masks
+        with self._lock:
+            if self._masks is None:
+                self._masks, self._element_codes, self._rule_keys = self._load()
+            return self._masks
+
+    def mask(self, role_id, element_code):
+        return self._ensure_loaded().get((role_id, element_code), 0)
+
+    def has_permission(self, role_id, element_code, permission_type):
+        bit = PERMISSION_BITS.get(permission_type)
+        if bit is None or role_id is None:
+            return False
+        return bool(self.mask(role_id, element_code) & bit)
+
+    def check_many(self, role_id, pairs):
+        # Один снимок матрицы на весь набор проверок
+        masks = self._ensure_loaded() if role_id is not None else {}
+        result = {}
+        for element_code, permission_type in pairs:
+            bit = PERMISSION_BITS.get(permission_type, 0)
+            result[(element_code, permission_type)] = bool(
+                masks.get((role_id, element_code), 0) & bit
+            )
+        return result
+
+    def role_masks(self, role_id):
+        if role_id is None:
+            return {}
+        return {
+            code: mask
+            for (rule_role_id, code), mask in self._ensure_loaded().items()
+            if rule_role_id == role_id
+        }
+
+    def update_rule(self, rule):
+        with self._lock:
+            if self._masks is None:
+                return
+            code = self._element_codes.get(rule.element_id)
+            if code is None:
+                # Правило для элемента, которого ещё нет в матрице
+                self._masks = None
+                return
+            masks = dict(self._masks)
+            # Правило могли перенести на другую роль или элемент
+            old_key = self._rule_keys.get(rule.pk)
+            if old_key is not None:
+                masks.pop(old_key, None)
+            key = (rule.role_id, code)
+            masks[key] = rule_mask(rule)
+            self._rule_keys[rule.pk] = key
+            self._masks = masks
+
+    def remove_rule(self, rule):
+        with self._lock:
+            if self._masks is None:
+                return
+            code = self._element_codes.get(rule.element_id)
+            if code is None:
+                self._masks = None
+                return
+            masks = dict(self._masks)
+            masks.pop(self._rule_keys.pop(rule.pk, (rule.role_id, code)), None)
+            self._masks = masks
+
+    def sync(self, generation):
+        # Вызывается в начале запроса: другой воркер мог изменить правила
+        if generation != self._generation:
+            self.invalidate()
+            self._generation = generation
+
+    def invalidate(self):
+        with self._lock:
+            self._masks = None
+            self._element_codes = {}
+            self._rule_keys = {}
+
+
+permission_matrix = PermissionMatrix()
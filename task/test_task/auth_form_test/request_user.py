@@ -0,0 +1,68 @@
+# auth_form_test/request_user.py
+# Пользователь текущего запроса вместе с ролью и правами роли. Загружается
+# один раз на запрос, поэтому страница стоит фиксированное число запросов,
+# сколько бы проверок прав ни сделал шаблон.
+from django.db.models import Prefetch
+
+from .permissions import FLAG_FIELDS, rule_mask
+
+
+REQUEST_USER_ATTR = '_request_user'
+
+
+def request_user_id(request):
+    # JWT из middleware позволяет не читать таблицу сессий
+    app_user = getattr(request, 'app_user', None)
+    if app_user is not None:
+        return app_user.id
+    return request.session.get('user_id')
+
+
+def user_queryset():
+    from .models import AccessRule, AppUser
+
+    rules = (
+        AccessRule.objects
+        .select_related('element')
+        .order_by()
+        .only('role', 'element', 'element__code', *FLAG_FIELDS)
+    )
+    # Деактивированный пользователь — AppUser.DoesNotExist
+    return AppUser.active.select_related('role').prefetch_related(
+        Prefetch('role__accessrule_set', queryset=rules, to_attr='preloaded_rules')
+    )
+
+
+def load_user(user_id):
+    """
+    Пользователь с ролью (один запрос) и всеми правилами роли (второй запрос).
+
+    Права складываются в user.preloaded_masks, и check_permission* этого
+    экземпляра больше не обращаются ни к БД, ни к общей матрице.
+    Может выбросить AppUser.DoesNotExist (в том числе для деактивированного).
+    """
+    user = user_queryset().get(id=user_id)
+    rules = user.role.preloaded_rules if user.role_id else ()
+    user.preloaded_masks = {rule.element.code: rule_mask(rule) for rule in rules}
+    return user
+
+
+def get_request_user(request):
+    """
+    Пользователь запроса, загруженный через load_user и запомненный на request.
+
+    None — запрос не аутентифицирован.
+    """
+    user = getattr(request, REQUEST_USER_ATTR, None)
+    if user is not None:
+        return user
+    user_id = request_user_id(request)
+    if user_id is None:
+        return None
+    user = load_user(user_id)
+    setattr(request, REQUEST_USER_ATTR, user)
+    app_user = getattr(request, 'app_user', None)
+    if app_user is not None:
+        # JWTUser.resolve() вернёт этот же экземпляр без повторного SELECT
+        app_user._user = user
+    return user
@@ -0,0 +1,104 @@
+# auth_form_test/routers.py
+import contextvars
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+REPLICATED_MODELS = {'appuser', 'role', 'businesselement', 'accessrule'}
+PIN_COOKIE_NAME = 'db_pin'
+
+_pinned = contextvars.ContextVar('db_pinned', default=False)
+_wrote = contextvars.ContextVar('db_wrote', default=False)
+
+
+def get_replicas():
+    return getattr(settings, 'READ_REPLICAS', [])
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+def _is_replicated(model):
+    return model._meta.app_label == 'auth_form_test' and model._meta.model_name in REPLICATED_MODELS
+
+
+class ReadReplicaRouter:
+    """
+    Чтения AppUser, Role, BusinessElement и AccessRule идут на реплики из
+    settings.READ_REPLICAS, запись — всегда на основную базу.
+
+    После записи текущий контекст (и, через cookie, следующие запросы того
+    же клиента) читает с основной базы, чтобы видеть свои изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _is_replicated(model):
+            return None
+        replicas = get_replicas()
+        if not replicas or _pinned.get():
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if not _is_replicated(model):
+            return None
+        _pinned.set(True)
+        _wrote.set(True)
+        # Явно: иначе Django сохранил бы объект туда, откуда его прочитал
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """Read-your-writes: после записи клиент на время читает с основной базы."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pinned_token = _pinned.set(PIN_COOKIE_NAME in request.COOKIES)
+        wrote_token = _wrote.set(False)
+        try:
+            return self._pin(self.get_response(request))
+        finally:
+            _pinned.reset(pinned_token)
+            _wrote.reset(wrote_token)
+
+    async def __acall__(self, request):
+        # sync_to_async возвращает изменения contextvars из потока обратно
+        pinned_token = _pinned.set(PIN_COOKIE_NAME in request.COOKIES)
+        wrote_token = _wrote.set(False)
+        try:
+            return self._pin(await self.get_response(request))
+        finally:
+            _pinned.reset(pinned_token)
+            _wrote.reset(wrote_token)
+
+    def _pin(self, response):
+        if _wrote.get() and get_replicas():
+            response.set_cookie(
+                PIN_COOKIE_NAME, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,131 @@
+# auth_form_test/session_store.py
+# Сессии в подписанной сжатой cookie: без SELECT/UPDATE django_session на
+# каждый запрос. Включается SESSION_ENGINE = 'auth_form_test.session_store'.
+import datetime
+import threading
+
+from asgiref.sync import sync_to_async
+from django.contrib.sessions.backends import signed_cookies
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from .generation import bump_generation, current_generation
+
+
+SESSION_GENERATION = 'sessions'
+SID_KEY = '_sid'
+SID_LENGTH = 16
+
+
+class RevocationList:
+    """
+    Отозванные id сессий.
+
+    Каждый воркер держит копию в памяти. После смены поколения
+    SESSION_GENERATION догружаются только записи, отозванные после
+    прошлой синхронизации (с запасом SYNC_OVERLAP на задержку коммита и
+    расхождение часов), а истёкшие выбрасываются из памяти. Полностью
+    таблица читается один раз — при первой проверке. Строки из таблицы
+    удаляет команда maintenance.
+    """
+
+    SYNC_OVERLAP = datetime.timedelta(seconds=60)
+
+    def __init__(self):
+        self._revoked = {}
+        self._generation = None
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def sync(self, generation):
+        if generation == self._generation:
+            return
+        from .models import RevokedSession
+
+        now = timezone.now()
+        rows = RevokedSession.objects.filter(expires_at__gt=now)
+        if self._synced_at is not None:
+            rows = rows.filter(revoked_at__gte=self._synced_at - self.SYNC_OVERLAP)
+        fresh = dict(rows.values_list('sid', 'expires_at'))
+        with self._lock:
+            self._revoked = {
+                **{key: value for key, value in self._revoked.items() if value > now},
+                **fresh,
+            }
+            self._generation = generation
+            self._synced_at = now
+
+    def is_revoked(self, sid):
+        self.sync(current_generation(SESSION_GENERATION))
+        expires_at = self._revoked.get(sid)
+        return expires_at is not None and expires_at > timezone.now()
+
+    def revoke(self, sid, expires_at):
+        from .models import RevokedSession
+
+        now = timezone.now()
+        RevokedSession.objects.update_or_create(
+            sid=sid, defaults={'expires_at': expires_at, 'revoked_at': now}
+        )
+        with self._lock:
+            self._revoked = {
+                **{key: value for key, value in self._revoked.items() if value > now},
+                sid: expires_at,
+            }
+        bump_generation(SESSION_GENERATION)
+
+    def clear(self):
+        with self._lock:
+            self._revoked = {}
+            self._generation = None
+            self._synced_at = None
+
+    def __len__(self):
+        return len(self._revoked)
+
+
+revocation_list = RevocationList()
+
+
+class SessionStore(signed_cookies.SessionStore):
+    """
+    Подписанная cookie с идентификатором сессии внутри.
+
+    flush() (выход) заносит идентификатор в список отзыва, поэтому
+    сохранённая копия cookie после выхода больше не принимается.
+    """
+
+    def load(self):
+        data = super().load()
+        sid = data.get(SID_KEY)
+        if sid and revocation_list.is_revoked(sid):
+            self.create()
+            return {}
+        return data
+
+    async def aload(self):
+        return await sync_to_async(self.load)()
+
+    def save(self, must_create=False):
+        self._session.setdefault(SID_KEY, get_random_string(SID_LENGTH))
+        super().save(must_create)
+
+    def cycle_key(self):
+        # Новая cookie не должна совпадать со старой и по идентификатору
+        self._revoke()
+        self._session[SID_KEY] = get_random_string(SID_LENGTH)
+        super().cycle_key()
+
+    def flush(self):
+        self._revoke()
+        super().flush()
+
+    async def aflush(self):
+        await sync_to_async(self.flush)()
+
+    def _revoke(self):
+        sid = self._session.get(SID_KEY)
+        if sid:
+            # Подпись cookie принимается не дольше SESSION_COOKIE_AGE с момента выдачи
+            expires_at = timezone.now() + datetime.timedelta(seconds=self.get_session_cookie_age())
+            revocation_list.revoke(sid, expires_at)
@@ -0,0 +1,76 @@
+# auth_form_test/signals.py
+import copy
+
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import generation, metrics, sqlite, throttling
+from .email_index import EMAIL_DELTA_GENERATION, email_index
+from .authentication import get_signing_key
+from .models import AccessRule, AppUser, Role, BusinessElement
+from .permissions import ACL_GENERATION, permission_matrix
+
+
+@receiver(post_save, sender=AccessRule)
+def access_rule_saved(sender, instance, **kwargs):
+    # Патч только после коммита: откат не должен оставить маску в памяти.
+    # Копия — потому что к коммиту экземпляр могут изменить (а после
+    # delete() Django обнуляет pk)
+    rule = copy.copy(instance)
+    transaction.on_commit(lambda: permission_matrix.update_rule(rule), using=kwargs.get('using'))
+    generation.bump_generation(ACL_GENERATION, using=kwargs.get('using'))
+
+
+@receiver(post_delete, sender=AccessRule)
+def access_rule_deleted(sender, instance, **kwargs):
+    rule = copy.copy(instance)
+    transaction.on_commit(lambda: permission_matrix.remove_rule(rule), using=kwargs.get('using'))
+    generation.bump_generation(ACL_GENERATION, using=kwargs.get('using'))
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=BusinessElement)
+@receiver(post_delete, sender=BusinessElement)
+def acl_structure_changed(sender, **kwargs):
+    # Код элемента или набор ролей поменялся — матрицу проще пересобрать.
+    # Сбрасываем и сейчас (не отдавать старые коды до коммита), и после
+    # коммита (не оставить матрицу, загруженную внутри транзакции)
+    permission_matrix.invalidate()
+    transaction.on_commit(permission_matrix.invalidate, using=kwargs.get('using'))
+    generation.bump_generation(ACL_GENERATION, using=kwargs.get('using'))
+
+
+@receiver(post_save, sender=AppUser)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields is not None and 'email' not in update_fields:
+        return
+    # Этот воркер знает о новом email сразу, остальные догрузят его по updated_at
+    email_index.add(instance.email)
+    generation.bump_generation(EMAIL_DELTA_GENERATION, using=kwargs.get('using'))
+
+
+@receiver(connection_created)
+def sqlite_connection_created(sender, connection, **kwargs):
+    sqlite.configure_connection(connection)
+
+
+@receiver(connection_created)
+def metrics_connection_created(sender, connection, **kwargs):
+    # У каждого потока свои соединения: MetricsMiddleware считает SQL и в sync_to_async
+    metrics.install_query_recorder(connection)
+
+
+@receiver(setting_changed)
+def generation_backend_changed(setting, **kwargs):
+    if setting == 'GENERATION_BACKEND':
+        generation.reset_backend()
+    elif setting in ('SECRET_KEY', 'JWT_SECRET_KEY'):
+        get_signing_key.cache_clear()
+    elif setting == 'LOGIN_THROTTLE':
+        throttling.reset_backend()
+    elif setting == 'EMAIL_INDEX':
+        email_index.invalidate()
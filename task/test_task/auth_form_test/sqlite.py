@@ -0,0 +1,51 @@
+# auth_form_test/sqlite.py
+from django.conf import settings
+
+
+# WAL позволяет читателям не ждать писателя, busy_timeout убирает
+# мгновенные "database is locked", synchronous=NORMAL безопасен в WAL
+DEFAULT_PRAGMAS = {
+    # Первой: режим фиксируется, как только в файл записан заголовок базы.
+    # Новые базы создаются с возможностью incremental_vacuum (см. maintenance.py)
+    'auto_vacuum': 'INCREMENTAL',
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Для in-memory баз (тесты) режим журнала и mmap не имеют смысла
+FILE_ONLY_PRAGMAS = {'journal_mode', 'mmap_size'}
+
+# Действуют только на пустую базу; у существующей запись PRAGMA лишь
+# ждала бы блокировку (режим меняется командой maintenance)
+NEW_DATABASE_PRAGMAS = {'auto_vacuum'}
+
+
+def get_pragmas():
+    return getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+
+
+def apply_pragmas(dbapi_connection, pragmas=None, in_memory=False):
+    # Принимает «сырое» соединение sqlite3, чтобы работать и вне ORM
+    pragmas = get_pragmas() if pragmas is None else pragmas
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA page_count')
+        is_new = cursor.fetchone()[0] == 0
+        for name, value in pragmas.items():
+            if in_memory and name in FILE_ONLY_PRAGMAS:
+                continue
+            if not is_new and name in NEW_DATABASE_PRAGMAS:
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+
+def configure_connection(connection):
+    if connection.vendor != 'sqlite':
+        return
+    apply_pragmas(connection.connection, in_memory=connection.is_in_memory_db())
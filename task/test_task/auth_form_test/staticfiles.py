@@ -0,0 +1,155 @@
+# auth_form_test/staticfiles.py
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # без brotli пишется только .gz
+    brotli = None
+
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.txt')
+MIN_COMPRESS_SIZE = 256
+# Порядок важен: br предпочтительнее gzip, если клиент принимает оба
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+_CSS_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/', re.S)
+
+
+def _minify_chunk(css):
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r' ?([{};,>]) ?', r'\1', css)
+    # Пробел перед ':' не трогаем: в селекторе «a :hover» он значим
+    return css.replace(': ', ':').replace(';}', '}')
+
+
+def minify_css(source):
+    """Удаляет комментарии и лишние пробелы; строки в кавычках не меняются."""
+    parts = []
+    position = 0
+    for match in _CSS_TOKEN_RE.finditer(source):
+        parts.append(_minify_chunk(source[position:match.start()]))
+        token = match.group()
+        parts.append('' if token.startswith('/*') else token)
+        position = match.end()
+    parts.append(_minify_chunk(source[position:]))
+    return ''.join(parts).replace(';}', '}').strip()
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    collectstatic с минификацией и предсжатием.
+
+    CSS минифицируется при копировании, поэтому хеш в имени считается уже
+    по итоговому содержимому. После хеширования рядом с каждым файлом
+    пишутся .gz и, если установлен brotli, .br.
+    """
+
+    def _save(self, name, content):
+        if name.endswith('.css'):
+            # chunks() перематывает файл: после хеширования он прочитан до конца
+            source = b''.join(content.chunks()).decode('utf-8')
+            content = ContentFile(minify_css(source).encode('utf-8'))
+        return super()._save(name, content)
+
+    def url(self, name, force=False):
+        # Хешированные имена и при DEBUG: файлы всегда берутся из STATIC_ROOT
+        return super().url(name, force=True)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in sorted(set(self.hashed_files.values())):
+            self._compress(hashed_name)
+
+    def _compress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        with self.open(name) as fh:
+            data = fh.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        self._replace(name + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            self._replace(name + '.br', brotli.compress(data, quality=11))
+
+    def _replace(self, name, data):
+        if self.exists(name):
+            self.delete(name)
+        super()._save(name, ContentFile(data))
+
+
+def accepted_encodings(header):
+    """
+    Accept-Encoding -> {кодировка: q}. Кодировки с q=0 явно запрещены
+    клиентом и попадают в словарь с нулём, а не пропускаются.
+    """
+    codings = {}
+    for item in header.split(','):
+        name, *params = item.split(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[name] = q
+    return codings
+
+
+def choose_encoding(header, available):
+    # Наибольший q; при равенстве — порядок PRECOMPRESSED (br раньше gzip)
+    codings = accepted_encodings(header)
+    best, best_q = None, 0.0
+    for name in available:
+        q = codings.get(name, codings.get('*', 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def serve(request, path):
+    """
+    Раздаёт собранную статику из STATIC_ROOT.
+
+    Отдаёт .br/.gz, если клиент их принимает; файлы с хешем в имени
+    кэшируются браузером на STATIC_MAX_AGE без перепроверки.
+    """
+    fullpath = safe_join(settings.STATIC_ROOT, path)
+    if not os.path.isfile(fullpath):
+        raise Http404
+    content_type, _ = mimetypes.guess_type(fullpath)
+
+    suffixes = {name: suffix for name, suffix in PRECOMPRESSED if os.path.isfile(fullpath + suffix)}
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''), suffixes)
+    if encoding:
+        fullpath += suffixes[encoding]
+
+    response = FileResponse(open(fullpath, 'rb'), content_type=content_type or 'application/octet-stream')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if HASHED_NAME_RE.search(path):
+        patch_cache_control(
+            response, public=True, immutable=True,
+            max_age=getattr(settings, 'STATIC_MAX_AGE', 365 * 24 * 60 * 60),
+        )
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
@@ -0,0 +1,69 @@
+# auth_form_test/template_cache.py
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+
+
+DEFAULT_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def iter_template_names(app_label='auth_form_test'):
+    root = os.path.join(apps.get_app_config(app_label).path, 'templates')
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith('.html'):
+                yield os.path.relpath(os.path.join(dirpath, filename), root).replace(os.sep, '/')
+
+
+def django_engines():
+    return [engine for engine in engines.all() if isinstance(engine, DjangoTemplates)]
+
+
+def uses_cached_loader(engine):
+    return any(isinstance(loader, CachedLoader) for loader in engine.engine.template_loaders)
+
+
+def warm_templates(names=None, raise_errors=False):
+    """
+    Компилирует шаблоны приложения во всех Django-движках.
+
+    С кэширующим загрузчиком скомпилированные шаблоны остаются в памяти
+    воркера, и запросы больше не читают и не разбирают файлы.
+    Возвращает {имя шаблона: TemplateSyntaxError} для сломанных шаблонов.
+    """
+    names = list(iter_template_names()) if names is None else names
+    errors = {}
+    for engine in django_engines():
+        for name in names:
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError as e:
+                if raise_errors:
+                    raise
+                errors[name] = e
+    return errors
+
+
+def build_engine(precompiled):
+    # Отдельный движок для замеров, чтобы не трогать кэш рабочего
+    config = settings.TEMPLATES[0]
+    loaders = getattr(settings, 'TEMPLATE_LOADERS', DEFAULT_LOADERS)
+    options = {
+        **config.get('OPTIONS', {}),
+        'debug': not precompiled,
+        'loaders': [(CachedLoader.__module__ + '.Loader', loaders)] if precompiled else loaders,
+    }
+    return DjangoTemplates({
+        'NAME': 'precompiled' if precompiled else 'uncached',
+        'DIRS': config.get('DIRS', []),
+        'APP_DIRS': False,
+        'OPTIONS': options,
+    })
@@ -0,0 +1,39 @@
+# auth_form_test/templatetags/acl.py
+from django import template
+
+register = template.Library()
+
+
+def _parse_pair(spec):
+    element_code, _, permission_type = spec.partition(':')
+    return element_code, permission_type
+
+
+@register.simple_tag
+def user_permissions(user, *specs):
+    """
+    {% user_permissions user 'orders:read' 'orders:update' as perms %}
+    {% if perms.orders.update %}...{% endif %}
+
+    Без аргументов возвращает все права роли пользователя.
+    Все проверки отвечаются из одной матрицы — не больше одного запроса.
+    """
+    if user is None:
+        return {}
+    if not specs:
+        return user.permission_table()
+
+    table = {}
+    for (element_code, permission_type), allowed in user.check_permissions(
+        _parse_pair(spec) for spec in specs
+    ).items():
+        table.setdefault(element_code, {})[permission_type] = allowed
+    return table
+
+
+@register.filter
+def has_permission(user, spec):
+    """{% if user|has_permission:'orders:read' %}"""
+    if user is None:
+        return False
+    return user.check_permission(*_parse_pair(spec))
@@ -1,3 +1,1452 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import gzip
+import io
+import time
+import os
+import runpy
+import shutil
+import sqlite3
+import tempfile
+import threading
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.template import Context, Template, engines as template_engines
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from .access_rules import PermissionMatrixError, apply_permission_matrix, clone_role, role_matrix
+from .archive import archive_deactivated
+from .benchmarks import compare, parse_importtime, percentile
+from .bulk_users import UserImporter, export_rows, read_rows, write_rows
+from .authentication import decode_token, revoke_token, verify_token
+from .email_index import (
+    EMAIL_GENERATION, BloomFilter, EmailIndex, email_checks, email_exists, email_index_delta_syncs,
+    email_index_rebuilds,
+)
+from .generation import (
+    DatabaseGenerationBackend, FileGenerationBackend, bump_generation, current_generation,
+)
+from .forms import LOGIN_USER_FIELDS, LoginForm
+from .hashers import ProfilePBKDF2PasswordHasher
+from .hashing import hashing_pool
+from .maintenance import run_cycle
+from .metrics import Gauge, Registry, request_latency, sql_queries_total
+from .models import AccessRule, AppUser, ArchivedUser, BusinessElement, GenerationCounter, RevokedSession, Role
+from .page_cache import CSRF_PLACEHOLDER, page_cache_requests
+from .permissions import ACL_GENERATION, PERMISSION_BITS, PermissionMatrix, permission_matrix, unpack_mask
+from .request_user import get_request_user, load_user
+from .routers import PIN_COOKIE_NAME, ReadReplicaRouter, ReplicaPinningMiddleware
+from .session_store import RevocationList, revocation_list
+from .sqlite import apply_pragmas
+from .staticfiles import minify_css, serve
+from .template_cache import iter_template_names, uses_cached_loader, warm_templates
+from .throttling import LocMemThrottleBackend, SQLiteThrottleBackend, reset_backend
+from .token_cache import token_cache
+from . import views_async
+from .views_async import OVERLOADED_MESSAGE
+
+
+class PermissionMatrixTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = Role.objects.create(name='Редактор матрицы')
+        cls.viewer = Role.objects.create(name='Читатель матрицы')
+        cls.orders = BusinessElement.objects.create(name='Заказы', code='orders')
+        cls.reports = BusinessElement.objects.create(name='Отчёты', code='reports')
+        cls.rule = AccessRule.objects.create(role=cls.editor, element=cls.orders, can_read=True)
+        AccessRule.objects.create(role=cls.editor, element=cls.reports)
+
+    def setUp(self):
+        permission_matrix.invalidate()
+        self.addCleanup(permission_matrix.invalidate)
+
+    def _load(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(permission_matrix.has_permission(self.editor.id, 'orders', 'read'))
+
+    def test_checks_after_load_cost_no_queries(self):
+        self._load()
+        with self.assertNumQueries(0):
+            self.assertFalse(permission_matrix.has_permission(self.editor.id, 'orders', 'update'))
+            self.assertFalse(permission_matrix.has_permission(self.viewer.id, 'orders', 'read'))
+            self.assertEqual(
+                permission_matrix.check_many(self.editor.id, [('orders', 'read'), ('reports', 'read')]),
+                {('orders', 'read'): True, ('reports', 'read'): False},
+            )
+
+    def test_rule_save_and_delete_patch_matrix_after_commit(self):
+        self._load()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rule.can_update = True
+            self.rule.save()
+            # До коммита матрица не меняется
+            self.assertFalse(permission_matrix.has_permission(self.editor.id, 'orders', 'update'))
+
+        with self.assertNumQueries(0):
+            self.assertTrue(permission_matrix.has_permission(self.editor.id, 'orders', 'update'))
+
+        # Правило перенесли на другую роль и элемент: старый ключ исчезает
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rule.role = self.viewer
+            self.rule.element = self.reports
+            self.rule.save()
+        with self.assertNumQueries(0):
+            self.assertFalse(permission_matrix.has_permission(self.editor.id, 'orders', 'read'))
+            self.assertTrue(permission_matrix.has_permission(self.viewer.id, 'reports', 'read'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rule.delete()
+        with self.assertNumQueries(0):
+            self.assertFalse(permission_matrix.has_permission(self.viewer.id, 'reports', 'read'))
+
+    def test_rolled_back_save_does_not_patch_matrix(self):
+        self._load()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.rule.can_delete = True
+            self.rule.save()
+        # Транзакцию откатили: колбэки не выполнены
+        self.assertTrue(callbacks)
+        self.assertFalse(permission_matrix.has_permission(self.editor.id, 'orders', 'delete'))
+
+    def test_role_and_element_changes_invalidate_matrix(self):
+        for change in (
+            lambda: Role.objects.create(name='Новая роль'),
+            lambda: BusinessElement.objects.filter(pk=self.reports.pk).get().save(),
+        ):
+            permission_matrix.invalidate()
+            self._load()
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            self._load()
+
+
+class UserPermissionTests(TestCase):
+
+    PAIRS = [('orders', 'read'), ('orders', 'delete'), ('reports', 'read')]
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name='Оператор')
+        orders = BusinessElement.objects.create(name='Заказы', code='orders')
+        reports = BusinessElement.objects.create(name='Отчёты', code='reports')
+        AccessRule.objects.create(role=role, element=orders, can_read=True, can_update=True)
+        AccessRule.objects.create(role=role, element=reports)
+        cls.operator = AppUser.objects.create(email='operator@example.com', name='Опер', last_name='Атор',
+                                              password='-', role=role)
+        cls.inactive = AppUser.objects.create(email='inactive@example.com', name='Не', last_name='Активен',
+                                              password='-', role=role, isActive=False)
+        cls.roleless = AppUser.objects.create(email='roleless@example.com', name='Без', last_name='Роли',
+                                              password='-')
+
+    def setUp(self):
+        permission_matrix.invalidate()
+        self.addCleanup(permission_matrix.invalidate)
+
+    def assert_operator_permissions(self, user):
+        self.assertEqual(user.check_permissions(self.PAIRS), {
+            ('orders', 'read'): True, ('orders', 'delete'): False, ('reports', 'read'): False,
+        })
+        table = user.permission_table()
+        self.assertEqual(sorted(table), ['orders', 'reports'])
+        self.assertEqual([name for name, allowed in table['orders'].items() if allowed], ['read', 'update'])
+        self.assertFalse(any(table['reports'].values()))
+        self.assertEqual(user.permission_table(['stats']), {'stats': unpack_mask(0)})
+
+    def test_shared_matrix_path(self):
+        user = AppUser.objects.get(pk=self.operator.pk)
+        self.assertIsNone(user.preloaded_masks)
+
+        # Одна загрузка матрицы на все проверки
+        with self.assertNumQueries(1):
+            self.assert_operator_permissions(user)
+
+    def test_preloaded_masks_path(self):
+        user = load_user(self.operator.pk)
+
+        with self.assertNumQueries(0):
+            self.assert_operator_permissions(user)
+        # Общая матрица так и не загружалась
+        self.assertIsNone(permission_matrix._masks)
+
+    def test_inactive_and_roleless_users_have_no_permissions(self):
+        inactive = AppUser.objects.get(pk=self.inactive.pk)
+        preloaded_inactive = AppUser.objects.get(pk=self.inactive.pk)
+        preloaded_inactive.preloaded_masks = {'orders': sum(PERMISSION_BITS.values())}
+        roleless = AppUser.objects.get(pk=self.roleless.pk)
+        preloaded_roleless = load_user(self.roleless.pk)
+
+        with self.assertNumQueries(0):
+            for user in (inactive, preloaded_inactive, roleless, preloaded_roleless):
+                with self.subTest(user=user.email, preloaded=user.preloaded_masks is not None):
+                    self.assertEqual(set(user.check_permissions(self.PAIRS).values()), {False})
+                    self.assertFalse(user.check_permission('orders', 'read'))
+                    self.assertEqual(user.permission_table(), {})
+                    self.assertEqual(user.permission_table(['orders']), {'orders': unpack_mask(0)})
+
+    def test_acl_template_tags(self):
+        template = Template(
+            "{% load acl %}"
+            "{% user_permissions user 'orders:read' 'orders:delete' as perms %}"
+            "{{ perms.orders.read }} {{ perms.orders.delete }} "
+            "{% if user|has_permission:'orders:update' %}update{% endif %} "
+            "{% user_permissions user as table %}{{ table.orders.update }} {{ table.reports.read }}"
+        )
+        user = load_user(self.operator.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(template.render(Context({'user': user})), 'True False update True False')
+            # Аноним: шаблон не падает, прав нет
+            self.assertEqual(template.render(Context({'user': None})).split(), [])
+
+
+class GenerationTests(TestCase):
+
+    def test_database_backend_counts_per_name(self):
+        backend = DatabaseGenerationBackend()
+
+        self.assertEqual(backend.get('test_counter'), 0)
+        self.assertEqual(backend.bump('test_counter'), 1)
+        self.assertEqual(backend.bump('test_counter'), 2)
+        self.assertEqual((backend.get('test_counter'), backend.get('other_counter')), (2, 0))
+
+    def test_file_backend_is_shared_between_workers(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        first, second = FileGenerationBackend(path), FileGenerationBackend(path)
+
+        self.assertEqual(second.get('acl'), 0)
+        self.assertEqual(first.bump('acl'), 1)
+        self.assertEqual(second.get('acl'), 1)
+        self.assertEqual(second.bump('acl'), 2)
+        self.assertEqual(first.get('acl'), 2)
+
+    def test_transaction_bumps_each_counter_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            role = Role.objects.create(name='Массовая правка')
+            elements = BusinessElement.objects.bulk_create([
+                BusinessElement(name=f'Объект {index}', code=f'bulk{index}') for index in range(5)
+            ])
+        acl, other = current_generation(ACL_GENERATION), current_generation('test_counter')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for element in elements:
+                AccessRule.objects.create(role=role, element=element, can_read=True)
+            bump_generation('test_counter')
+            bump_generation('test_counter')
+
+        self.assertEqual(current_generation(ACL_GENERATION), acl + 1)
+        self.assertEqual(current_generation('test_counter'), other + 1)
+
+    def test_rolled_back_savepoint_does_not_swallow_bump(self):
+        before = current_generation('test_counter')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    bump_generation('test_counter')
+                    raise ValueError
+            except ValueError:
+                pass
+            bump_generation('test_counter')
+
+        self.assertEqual(current_generation('test_counter'), before + 1)
+
+    def test_other_worker_reloads_matrix_on_generation_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            role = Role.objects.create(name='Другой воркер')
+            element = BusinessElement.objects.create(name='Счета', code='invoices')
+        # Матрица другого воркера: сигналы этого процесса её не патчат
+        other = PermissionMatrix()
+        other.sync(current_generation(ACL_GENERATION))
+        self.assertFalse(other.has_permission(role.id, 'invoices', 'read'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AccessRule.objects.create(role=role, element=element, can_read=True)
+        self.assertFalse(other.has_permission(role.id, 'invoices', 'read'))
+
+        other.sync(current_generation(ACL_GENERATION))
+        self.assertTrue(other.has_permission(role.id, 'invoices', 'read'))
+
+
+class AccessRulesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = Role.objects.create(name='Менеджер')
+        cls.orders = BusinessElement.objects.create(name='Заказы', code='orders')
+        cls.reports = BusinessElement.objects.create(name='Отчёты', code='reports')
+        AccessRule.objects.create(role=cls.manager, element=cls.orders, can_read=True)
+        AccessRule.objects.create(role=cls.manager, element=cls.reports, can_read=True)
+
+    def test_dry_run_reports_diff_without_writing(self):
+        result = apply_permission_matrix(
+            {'Менеджер': {'orders': ['read', 'update'], 'reports': 'read'}}, prune=True, dry_run=True,
+        )
+
+        self.assertEqual(result, {'created': 0, 'updated': 1, 'deleted': 0, 'unchanged': 1})
+        self.assertEqual(role_matrix(self.manager)['orders'], ['read'])
+        with self.assertRaises(PermissionMatrixError):
+            apply_permission_matrix({'Нет такой роли': {}})
+
+    def test_upsert_touches_only_changed_rules(self):
+        stats = BusinessElement.objects.create(name='Статистика', code='stats')
+        with self.captureOnCommitCallbacks(execute=True):
+            result = apply_permission_matrix({'Менеджер': {
+                'orders': {'read': True, 'delete': True}, 'reports': 'read', 'stats': 'all',
+            }})
+
+        self.assertEqual(result, {'created': 1, 'updated': 1, 'deleted': 0, 'unchanged': 1})
+        rules = {rule.element_id: rule for rule in AccessRule.objects.filter(role=self.manager)}
+        self.assertTrue(rules[self.orders.id].can_delete)
+        self.assertFalse(rules[self.orders.id].can_update)
+        self.assertTrue(rules[stats.id].can_delete_all)
+        self.assertTrue(permission_matrix.has_permission(self.manager.id, 'stats', 'update_all'))
+
+    def test_prune_deletes_many_rules(self):
+        # Больше пар, чем выдерживала цепочка OR (предел глубины выражения SQLite — 1000)
+        elements = BusinessElement.objects.bulk_create([
+            BusinessElement(name=f'Объект {index}', code=f'element{index}') for index in range(1200)
+        ])
+        AccessRule.objects.bulk_create([
+            AccessRule(role=self.manager, element=element, can_read=True) for element in elements
+        ])
+
+        generation = current_generation(ACL_GENERATION)
+
+        # Роли, объекты, текущие правила, 3 DELETE порциями по 500 и точка сохранения
+        with self.assertNumQueries(8), self.captureOnCommitCallbacks() as callbacks:
+            result = apply_permission_matrix({'Менеджер': {'orders': 'read'}}, prune=True)
+        # Одна пересборка матрицы и одно поколение, а не по строке
+        self.assertEqual(len(callbacks), 1)
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(result, {'created': 0, 'updated': 0, 'deleted': 1201, 'unchanged': 1})
+        self.assertEqual(current_generation(ACL_GENERATION), generation + 1)
+        self.assertEqual(role_matrix(self.manager), {'orders': ['read']})
+
+    def test_clone_role_copies_and_prunes(self):
+        auditor = Role.objects.create(name='Аудитор', description='Только чтение')
+        AccessRule.objects.create(role=auditor, element=BusinessElement.objects.create(name='Логи', code='logs'))
+
+        role, result = clone_role('Менеджер', 'Аудитор')
+
+        self.assertEqual(role, auditor)
+        self.assertEqual(result, {'created': 2, 'updated': 0, 'deleted': 1, 'unchanged': 0})
+        self.assertEqual(role_matrix(auditor), role_matrix(self.manager))
+        copy, _ = clone_role(self.manager, 'Стажёр')
+        self.assertEqual((copy.description, role_matrix(copy)), ('', role_matrix(self.manager)))
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        reset_backend()
+        self.addCleanup(reset_backend)
+
+    def samples(self, metric):
+        return {name + labels: value for name, labels, value in metric.samples()}
+
+    def test_registry_renders_prometheus_text(self):
+        registry = Registry()
+        hits = registry.counter('test_hits_total', 'Попадания', ('view',))
+        latency = registry.histogram('test_latency_seconds', 'Задержка', buckets=(0.1, 1.0))
+        hits.inc('a"b', amount=2)
+        latency.observe(value=0.05)
+        latency.observe(value=0.5)
+        latency.observe(value=5)
+
+        @registry.register_collector
+        def entries():
+            gauge = Gauge('test_entries', 'Записи')
+            gauge.set(value=1.5)
+            return [gauge]
+
+        self.assertEqual(registry.render(), '\n'.join([
+            '# HELP test_hits_total Попадания',
+            '# TYPE test_hits_total counter',
+            'test_hits_total{view="a\\"b"} 2',
+            '# HELP test_latency_seconds Задержка',
+            '# TYPE test_latency_seconds histogram',
+            'test_latency_seconds_bucket{le="0.1"} 1',
+            'test_latency_seconds_bucket{le="1"} 2',
+            'test_latency_seconds_bucket{le="+Inf"} 3',
+            'test_latency_seconds_sum 5.55',
+            'test_latency_seconds_count 3',
+            '# HELP test_entries Записи',
+            '# TYPE test_entries gauge',
+            'test_entries 1.5',
+        ]) + '\n')
+
+    def test_middleware_counts_every_query_of_the_request(self):
+        before = sql_queries_total.value('login')
+        count_before = self.samples(request_latency).get('auth_request_duration_seconds_count{view="login"}', 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('login'), {'email': 'nobody@example.com', 'password': 'secret-password'})
+
+        self.assertGreater(len(queries), 0)
+        self.assertEqual(sql_queries_total.value('login') - before, len(queries))
+        self.assertEqual(
+            self.samples(request_latency)['auth_request_duration_seconds_count{view="login"}'], count_before + 1,
+        )
+
+    @override_settings(METRICS={'SAMPLE_RATE': 0, 'ALLOWED_IPS': ('127.0.0.1',)})
+    def test_zero_sample_rate_records_nothing(self):
+        before = sql_queries_total.value('login')
+
+        self.client.post(reverse('login'), {'email': 'nobody@example.com', 'password': 'secret-password'})
+
+        self.assertEqual(sql_queries_total.value('login'), before)
+
+    @override_settings(METRICS={'SAMPLE_RATE': 1.0, 'ALLOWED_IPS': ('127.0.0.1',)})
+    def test_endpoint_is_limited_to_allowed_ips(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE auth_request_duration_seconds histogram', response.content.decode())
+
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1').status_code, 404)
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='::1').status_code, 404)
+
+
+@override_settings(PASSWORD_HASHER_PROFILE='fast', READ_REPLICAS=[])
+class LoginQueryCountTests(TestCase):
+    # Поколение ACL + пользователь с ролью + создание сессии (SELECT, SAVEPOINT, INSERT, RELEASE)
+    MAX_LOGIN_QUERIES = 6
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = Role.objects.create(name='Менеджер')
+        cls.user = AppUser.objects.create(
+            email='user@example.com',
+            name='Иван',
+            last_name='Петров',
+            password=make_password('secret-password'),
+            role=cls.role,
+        )
+
+    def _user_queries(self, queries):
+        return [query for query in queries if 'FROM "users"' in query['sql']]
+
+    def test_login_fits_query_budget(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('login'), {
+                'email': 'user@example.com',
+                'password': 'secret-password',
+            })
+
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(len(self._user_queries(queries)), 1)
+        self.assertLessEqual(len(queries), self.MAX_LOGIN_QUERIES)
+
+    def test_login_form_loads_role_with_user(self):
+        form = LoginForm({'email': 'user@example.com', 'password': 'secret-password'})
+        with self.assertNumQueries(1):
+            self.assertTrue(form.is_valid())
+            user = form.cleaned_data['user']
+            self.assertEqual(user.role.name, 'Менеджер')
+            user.generate_jwt_token()
+
+    def test_failed_login_costs_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('login'), {
+                'email': 'user@example.com',
+                'password': 'wrong-password',
+            })
+
+        self.assertEqual(len(self._user_queries(queries)), 1)
+
+    def test_deactivated_user_is_rejected_by_form(self):
+        AppUser.objects.filter(pk=self.user.pk).update(isActive=False)
+
+        response = self.client.post(reverse('login'), {
+            'email': 'user@example.com',
+            'password': 'secret-password',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Аккаунт деактивирован')
+        self.assertNotIn('user_id', self.client.session)
+
+    def test_jwt_failure_is_logged(self):
+        with mock.patch.object(AppUser, 'generate_jwt_token', side_effect=RuntimeError('no key')), \
+                self.assertLogs('auth_form_test.views', 'ERROR') as logs:
+            response = self.client.post(reverse('login'), {
+                'email': 'user@example.com',
+                'password': 'secret-password',
+            })
+
+        self.assertEqual(response.cookies['auth_token'].value, f'session-{self.user.id}')
+        self.assertIn('no key', logs.output[0])
+
+
+@override_settings(
+    PASSWORD_HASHER_PROFILES={'strong': {'ITERATIONS': 20}, 'weak': {'ITERATIONS': 10}},
+    PASSWORD_REHASH_IN_BACKGROUND=False,
+    READ_REPLICAS=[],
+)
+class PasswordRehashTests(TestCase):
+
+    def _user_with_hash(self, iterations):
+        encoded = ProfilePBKDF2PasswordHasher().encode('secret-password', 'salt' * 6, iterations)
+        return AppUser.objects.create(
+            email='rehash@example.com', name='Пётр', last_name='Сидоров', password=encoded,
+        )
+
+    def _login(self):
+        form = LoginForm({'email': 'rehash@example.com', 'password': 'secret-password'})
+        self.assertTrue(form.is_valid())
+
+    def _iterations(self, user):
+        user.refresh_from_db()
+        return ProfilePBKDF2PasswordHasher().decode(user.password)['iterations']
+
+    @override_settings(PASSWORD_HASHER_PROFILE='strong')
+    def test_login_upgrades_weaker_hash(self):
+        user = self._user_with_hash(10)
+        self._login()
+        self.assertEqual(self._iterations(user), 20)
+
+    @override_settings(PASSWORD_HASHER_PROFILE='weak')
+    def test_cheaper_profile_never_downgrades_hash(self):
+        user = self._user_with_hash(20)
+        self._login()
+        self.assertEqual(self._iterations(user), 20)
+
+
+class BenchmarkHelpersTests(SimpleTestCase):
+
+    def test_percentile_uses_nearest_rank(self):
+        samples = [5, 1, 4, 2, 3, 6, 7, 8, 9, 10]
+
+        self.assertEqual(percentile([], 95), 0.0)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertEqual(percentile(samples, 50), 5)
+        self.assertEqual(percentile(samples, 95), 10)
+        self.assertEqual(percentile(samples, 0), 1)
+
+    def test_compare_flags_only_regressions_beyond_tolerance(self):
+        baseline = {
+            'login': {'p50_ms': 10.0, 'p95_ms': 20.0, 'throughput_rps': 100.0, 'errors': 0},
+            'dashboard': {'p50_ms': 5.0, 'queries_per_request': 4, 'throughput_rps': 200.0},
+        }
+        results = {
+            'login': {'p50_ms': 11.9, 'p95_ms': 30.0, 'throughput_rps': 70.0, 'errors': 2},
+            'dashboard': {'p50_ms': 5.5, 'queries_per_request': 4, 'throughput_rps': 190.0, 'errors': 0},
+            'register': {'p50_ms': 100.0, 'errors': 0},
+        }
+
+        self.assertEqual(compare(results, baseline, tolerance=0.2), [
+            'login.p95_ms: 20.0 -> 30.0',
+            'login.throughput_rps: 100.0 -> 70.0',
+            'login.errors: 0 -> 2',
+        ])
+        self.assertEqual(compare(results, baseline, tolerance=0.5), ['login.errors: 0 -> 2'])
+
+    def test_parse_importtime(self):
+        stderr = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   django.utils\n'
+            'import time:      1500 |       1620 | django\n'
+            'Traceback noise\n'
+        )
+
+        self.assertEqual(parse_importtime(stderr), [
+            {'module': 'django.utils', 'self_us': 120, 'cumulative_us': 120, 'depth': 1},
+            {'module': 'django', 'self_us': 1500, 'cumulative_us': 1620, 'depth': 0},
+        ])
+
+
+class SQLiteTuningTests(SimpleTestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        for suffix in ('-wal', '-shm'):
+            self.addCleanup(lambda p=self.path + suffix: os.path.exists(p) and os.remove(p))
+
+    def _connect(self, tuned):
+        # isolation_level=None: транзакциями управляем вручную
+        conn = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(conn.close)
+        if tuned:
+            apply_pragmas(conn)
+            conn.execute('PRAGMA busy_timeout = 0')
+        return conn
+
+    def _hold_write_lock(self, tuned):
+        writer = self._connect(tuned)
+        writer.execute('CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, name TEXT)')
+        writer.execute("INSERT INTO items (name) VALUES ('committed')")
+        writer.execute('BEGIN EXCLUSIVE')
+        writer.execute("INSERT INTO items (name) VALUES ('pending')")
+        return writer
+
+    def test_reader_not_blocked_by_writer_in_wal(self):
+        writer = self._hold_write_lock(tuned=True)
+        reader = self._connect(tuned=True)
+
+        rows = reader.execute('SELECT name FROM items').fetchall()
+
+        self.assertEqual(rows, [('committed',)])
+        writer.execute('COMMIT')
+        self.assertEqual(reader.execute('SELECT COUNT(*) FROM items').fetchone(), (2,))
+
+    def test_reader_blocked_by_writer_without_tuning(self):
+        self._hold_write_lock(tuned=False)
+        reader = self._connect(tuned=False)
+
+        with self.assertRaisesMessage(sqlite3.OperationalError, 'database is locked'):
+            reader.execute('SELECT name FROM items').fetchall()
+
+    def test_pragmas_applied(self):
+        conn = self._connect(tuned=True)
+
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone(), ('wal',))
+        self.assertEqual(conn.execute('PRAGMA synchronous').fetchone(), (1,))
+
+
+@override_settings(READ_REPLICAS=['replica'])
+class ReadReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+        self.factory = RequestFactory()
+
+    def _run(self, view, **cookies):
+        request = self.factory.get('/')
+        request.COOKIES.update(cookies)
+        return ReplicaPinningMiddleware(view)(request)
+
+    def test_reads_go_to_replica_writes_to_primary(self):
+        def view(request):
+            self.assertEqual(self.router.db_for_read(AppUser), 'replica')
+            self.assertEqual(self.router.db_for_write(AppUser), 'default')
+            return HttpResponse()
+
+        self._run(view)
+
+    def test_unrelated_models_are_not_routed(self):
+        def view(request):
+            self.assertIsNone(self.router.db_for_read(GenerationCounter))
+            return HttpResponse()
+
+        self._run(view)
+
+    def test_reads_stick_to_primary_after_write(self):
+        def view(request):
+            self.router.db_for_write(Role)
+            self.assertEqual(self.router.db_for_read(AppUser), 'default')
+            return HttpResponse()
+
+        response = self._run(view)
+
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_pin_cookie_routes_next_request_to_primary(self):
+        def view(request):
+            self.assertEqual(self.router.db_for_read(AppUser), 'default')
+            return HttpResponse()
+
+        response = self._run(view, **{PIN_COOKIE_NAME: '1'})
+
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+
+    @override_settings(READ_REPLICAS=[])
+    def test_without_replicas_everything_uses_primary(self):
+        def view(request):
+            self.assertEqual(self.router.db_for_read(AppUser), 'default')
+            return HttpResponse()
+
+        self._run(view)
+
+
+class QueryPlanTests(TestCase):
+
+    def _plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queryset, index_name=None):
+        plan = self._plan(queryset)
+        self.assertIn(f'USING INDEX {index_name}' if index_name else 'USING', plan)
+        self.assertNotRegex(plan, r'SCAN \w+$|SCAN \w+ \|')
+        self.assertNotIn('TEMP B-TREE', plan)
+        return plan
+
+    def test_login_lookup_by_email(self):
+        queryset = (
+            AppUser.active.select_related('role')
+            .only(*LOGIN_USER_FIELDS)
+            .filter(email='user@example.com')
+            # Как в get(): сортировка сбрасывается
+            .order_by()
+        )
+        self.assertIn('SEARCH users USING INDEX', self.assertUsesIndex(queryset))
+
+    def test_dashboard_lookup_by_id(self):
+        self.assertIn('SEARCH users USING INDEX', self.assertUsesIndex(AppUser.objects.filter(id=uuid.uuid4())))
+
+    def test_active_emails_use_partial_index(self):
+        queryset = AppUser.objects.filter(isActive=True).order_by().values_list('email', flat=True)
+        self.assertUsesIndex(queryset, 'users_active_email_idx')
+
+    def test_default_ordering_uses_date_index(self):
+        self.assertUsesIndex(AppUser.objects.all()[:20], 'users_date_reg_idx')
+
+    def test_role_rules_use_covering_index(self):
+        queryset = (
+            AccessRule.objects.filter(role_id=uuid.uuid4())
+            .order_by()
+            .values_list('element_id', 'can_read', 'can_update', 'can_delete')
+        )
+        self.assertIn('COVERING INDEX accessrule_role_perm_idx', self._plan(queryset))
+
+
+@override_settings(PAGE_CACHE={'ENABLED': True, 'ALIAS': 'pages', 'TIMEOUT': 60})
+class PageCacheTests(TestCase):
+
+    def setUp(self):
+        caches['pages'].clear()
+
+    def test_second_request_is_served_from_cache(self):
+        hits = page_cache_requests.value('index', 'hit')
+        first = self.client.get(reverse('index'))
+        second = self.client.get(reverse('index'))
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(page_cache_requests.value('index', 'hit'), hits + 1)
+        self.assertIn('Cookie', second['Vary'])
+
+    def test_cached_form_gets_fresh_csrf_token(self):
+        self.client.get(reverse('login'))
+        client = self.client_class(enforce_csrf_checks=True)
+        response = client.get(reverse('login'))
+
+        self.assertNotContains(response, CSRF_PLACEHOLDER)
+        self.assertIn('csrftoken', response.cookies)
+        response = client.post(reverse('login'), {
+            'csrfmiddlewaretoken': self._form_token(response),
+            'email': 'nobody@example.com',
+            'password': 'x',
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def _form_token(self, response):
+        html = response.content.decode()
+        marker = 'name="csrfmiddlewaretoken" value="'
+        return html.split(marker, 1)[1].split('"', 1)[0]
+
+
+class StaticPipelineTests(TestCase):
+
+    def test_minify_css_keeps_strings_and_selectors(self):
+        source = '/* шапка */\na :hover ,\n.b > .c {\n    content: "a  /* b */";\n    margin: 0 auto;\n}\n'
+
+        self.assertEqual(minify_css(source), 'a :hover,.b>.c{content:"a  /* b */";margin:0 auto}')
+
+    def test_collected_css_is_hashed_compressed_and_cached(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        storages = {**settings.STORAGES, 'staticfiles': settings.STATIC_PIPELINE_STORAGE}
+        with self.settings(STATIC_ROOT=static_root, STORAGES=storages):
+            from django.contrib.staticfiles.storage import staticfiles_storage
+
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed_name = staticfiles_storage.stored_name('auth_form_test/css/login.css')
+
+            request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+            response = serve(request, hashed_name)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'text/css')
+        css = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertTrue(css.startswith('*{margin:0;'))
+
+    def test_precompressed_variant_respects_q_values(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        for name in ('app.css', 'app.css.gz', 'app.css.br'):
+            with open(os.path.join(static_root, name), 'wb') as fh:
+                fh.write(name.encode())
+
+        cases = {
+            'gzip, deflate, br': 'br',
+            'br;q=0, gzip': 'gzip',
+            'gzip;q=0': None,
+            'GZIP;Q=0.5, br;q=0.2': 'gzip',
+            '*;q=0.5, br;q=0': 'gzip',
+            'x-gzip, brotli': None,
+            'identity': None,
+        }
+        with self.settings(STATIC_ROOT=static_root):
+            for header, expected in cases.items():
+                with self.subTest(header=header):
+                    response = serve(RequestFactory().get('/', HTTP_ACCEPT_ENCODING=header), 'app.css')
+                    self.assertEqual(response.get('Content-Encoding'), expected)
+                    suffix = {'br': '.br', 'gzip': '.gz', None: ''}[expected]
+                    self.assertEqual(b''.join(response.streaming_content), f'app.css{suffix}'.encode())
+
+
+class ThrottlingTests(TestCase):
+
+    def setUp(self):
+        # Бакеты общего бэкенда не должны переходить между тестами
+        reset_backend()
+        self.addCleanup(reset_backend)
+
+    def test_bucket_refills_and_expires(self):
+        backend = LocMemThrottleBackend()
+
+        self.assertEqual(backend.consume('k', 2, 1.0, now=100.0), (True, 0.0))
+        self.assertEqual(backend.consume('k', 2, 1.0, now=100.0), (True, 0.0))
+        self.assertEqual(backend.consume('k', 2, 1.0, now=100.0), (False, 1.0))
+        self.assertTrue(backend.consume('k', 2, 1.0, now=101.0)[0])
+        backend.consume('other', 2, 1.0, now=110.0)
+        self.assertEqual(len(backend), 1)
+
+    def test_sqlite_backend_is_shared_between_workers(self):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        for suffix in ('', '-wal', '-shm'):
+            self.addCleanup(lambda p=path + suffix: os.path.exists(p) and os.remove(p))
+        first, second = SQLiteThrottleBackend(path), SQLiteThrottleBackend(path)
+
+        self.assertTrue(first.consume('k', 1, 0.5, now=100.0)[0])
+        self.assertEqual(second.consume('k', 1, 0.5, now=100.0), (False, 2.0))
+
+    @override_settings(LOGIN_THROTTLE={'RATES': {'email': '1/min'}})
+    def test_throttled_login_skips_password_check(self):
+        # Пользователь существует: без ограничения пароль был бы проверен
+        AppUser.objects.create(email='user@example.com', name='Иван', last_name='Иванов',
+                               password=make_password('secret-password'))
+        data = {'email': 'user@example.com', 'password': 'wrong-password'}
+        with mock.patch('django.contrib.auth.hashers.check_password', return_value=False) as check_password:
+            self.assertEqual(self.client.post(reverse('login'), data).status_code, 200)
+        check_password.assert_called_once()
+
+        with mock.patch('django.contrib.auth.hashers.check_password') as check_password:
+            response = self.client.post(reverse('login'), data)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        check_password.assert_not_called()
+
+
+class JWTRevocationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AppUser.objects.create(
+            email='jwt@example.com', name='Ольга', last_name='Иванова', password='-',
+        )
+
+    def setUp(self):
+        self.token = self.user.generate_jwt_token()
+        self.addCleanup(token_cache.clear)
+        self.addCleanup(revocation_list.clear)
+
+    def _new_process(self):
+        # Чистое состояние другого воркера или процесса после перезапуска
+        token_cache.clear()
+        revocation_list.clear()
+
+    def test_revocation_is_seen_by_other_processes(self):
+        self.assertIsNotNone(verify_token(self.token))
+        revoke_token(self.token, decode_token(self.token))
+
+        self._new_process()
+        self.assertIsNone(verify_token(self.token))
+
+    def test_cached_token_revoked_elsewhere_is_rejected(self):
+        claims = verify_token(self.token)
+        self.assertIsNotNone(token_cache.get(self.token))
+
+        # Другой воркер: своя копия списка, поколение меняется после коммита
+        with self.captureOnCommitCallbacks(execute=True):
+            RevocationList().revoke(claims['jti'], timezone.now() + datetime.timedelta(days=7))
+
+        self.assertIsNone(verify_token(self.token))
+
+
+    def test_logged_out_token_is_rejected_by_protected_views(self):
+        self.user.password = make_password('secret-password')
+        self.user.save()
+        self.client.post(reverse('login'), {'email': 'jwt@example.com', 'password': 'secret-password'})
+        token = self.client.session['jwt_token']
+        # Выход без cookie auth_token: токен из сессии всё равно отзывается
+        self.client.cookies.pop('auth_token', None)
+        self.client.get(reverse('logout'))
+
+        self._new_process()
+        client = self.client_class(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = client.get(reverse('dashboard'))
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        response = client.post(reverse('update_profile'), {
+            'email': 'jwt@example.com', 'name': 'Hacked', 'last_name': 'Иванова',
+        })
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'Ольга')
+
+@override_settings(
+    SESSION_ENGINE='auth_form_test.session_store',
+    PASSWORD_HASHER_PROFILE='fast',
+    READ_REPLICAS=[],
+)
+class SignedCookieSessionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        AppUser.objects.create(
+            email='user@example.com',
+            name='Иван',
+            last_name='Петров',
+            password=make_password('secret-password'),
+        )
+
+    def test_session_lives_in_cookie(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('login'), {'email': 'user@example.com', 'password': 'secret-password'})
+
+        self.assertFalse([query for query in queries if 'django_session' in query['sql']])
+        self.assertIn('user_id', self.client.session)
+
+    def test_logout_revokes_replayed_cookie(self):
+        self.client.post(reverse('login'), {'email': 'user@example.com', 'password': 'secret-password'})
+        cookie = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.client.get(reverse('logout'))
+
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = cookie
+        self.client.cookies.pop('auth_token', None)
+        self.assertNotIn('user_id', self.client.session)
+        response = self.client.get(reverse('dashboard'))
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+
+    def test_workers_load_only_new_revocations(self):
+        expires_at = timezone.now() + datetime.timedelta(days=1)
+        RevokedSession.objects.create(
+            sid='old-sid', expires_at=expires_at, revoked_at=timezone.now() - datetime.timedelta(days=1),
+        )
+        worker = RevocationList()
+        worker.sync(1)
+        self.assertEqual(len(worker), 1)
+
+        # Другой воркер отзывает сессию и меняет поколение
+        RevocationList().revoke('new-sid', expires_at)
+        with CaptureQueriesContext(connection) as queries:
+            worker.sync(2)
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"revoked_at" >=', queries[0]['sql'])
+        self.assertEqual(len(worker), 2)
+
+
+class MaintenanceTests(TestCase):
+
+    def test_expired_rows_are_deleted_in_batches(self):
+        past = timezone.now() - datetime.timedelta(days=1)
+        future = timezone.now() + datetime.timedelta(days=1)
+        RevokedSession.objects.bulk_create(
+            [RevokedSession(sid=f'old{i}', expires_at=past) for i in range(5)]
+            + [RevokedSession(sid='fresh', expires_at=future)]
+        )
+        Session.objects.create(session_key='expired', session_data='', expire_date=past)
+
+        report = run_cycle(batch_size=2, pause=0, vacuum_pages=0)
+
+        self.assertEqual(report['revoked_sessions'], {'deleted': 5, 'finished': True, 'backlog': 0})
+        self.assertEqual(report['sessions']['deleted'], 1)
+        self.assertEqual(list(RevokedSession.objects.values_list('sid', flat=True)), ['fresh'])
+
+    def test_time_budget_leaves_backlog(self):
+        past = timezone.now() - datetime.timedelta(days=1)
+        RevokedSession.objects.bulk_create([RevokedSession(sid=f'old{i}', expires_at=past) for i in range(5)])
+
+        report = run_cycle(batch_size=2, time_budget=0, pause=0, vacuum_pages=0)
+
+        self.assertEqual(report['revoked_sessions'], {'deleted': 0, 'finished': False, 'backlog': 5})
+
+
+class RequestUserTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name='Редактор')
+        for index in range(5):
+            element = BusinessElement.objects.create(name=f'Объект {index}', code=f'element{index}')
+            AccessRule.objects.create(role=role, element=element, can_read=True, can_update=index % 2 == 0)
+        cls.user = AppUser.objects.create(
+            email='editor@example.com', name='Анна', last_name='Смирнова', password='-', role=role,
+        )
+
+    def _request(self):
+        request = RequestFactory().get('/dashboard/')
+        request.app_user = None
+        request.session = {'user_id': str(self.user.id)}
+        return request
+
+    def test_permission_checks_cost_fixed_queries(self):
+        request = self._request()
+        # Пользователь с ролью + правила роли с элементами
+        with self.assertNumQueries(2):
+            user = get_request_user(request)
+            self.assertEqual(user.role.name, 'Редактор')
+            for index in range(5):
+                self.assertTrue(user.check_permission(f'element{index}', 'read'))
+                self.assertEqual(user.check_permission(f'element{index}', 'update'), index % 2 == 0)
+            self.assertFalse(user.check_permission('missing', 'read'))
+            self.assertEqual(len(user.permission_table()), 5)
+            self.assertIs(get_request_user(request), user)
+
+    def test_dashboard_loads_user_once(self):
+        session = self.client.session
+        session['user_id'] = str(self.user.id)
+        session.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'))
+
+        self.assertContains(response, 'element3')
+        self.assertEqual(sum('FROM "users"' in query['sql'] for query in queries), 1)
+        self.assertEqual(sum('FROM "auth_form_test_accessrule"' in query['sql'] for query in queries), 1)
+
+
+class ArchiveUsersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name='Клиент')
+        now = timezone.now()
+        AppUser.objects.bulk_create([
+            AppUser(
+                email=f'old{index}@example.com', name='Старый', last_name='Аккаунт', password='-',
+                isActive=False, deactivated_at=now - datetime.timedelta(days=200), role=role,
+            )
+            for index in range(5)
+        ] + [
+            AppUser(email='recent@example.com', name='Недавний', last_name='Аккаунт', password='-',
+                    isActive=False, deactivated_at=now - datetime.timedelta(days=1)),
+            AppUser(email='active@example.com', name='Активный', last_name='Аккаунт', password='-'),
+        ])
+
+    def test_deactivated_users_are_hidden_by_active_manager(self):
+        self.assertEqual(list(AppUser.active.values_list('email', flat=True)), ['active@example.com'])
+        form = LoginForm({'email': 'recent@example.com', 'password': 'secret-password'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('Аккаунт деактивирован', str(form.errors))
+
+    def test_long_deactivated_users_move_to_archive_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(archive_deactivated(days=90, batch_size=2), 5)
+
+        self.assertEqual(sum(query['sql'].startswith('DELETE FROM "users"') for query in queries), 3)
+        self.assertEqual(AppUser.objects.count(), 2)
+        archived = ArchivedUser.objects.get(email='old0@example.com')
+        self.assertEqual(archived.role_name, 'Клиент')
+        self.assertEqual(archive_deactivated(days=90), 0)
+
+
+class BulkUsersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.create(name='Клиент')
+        AppUser.objects.create(email='taken@example.com', name='Занят', last_name='Адрес',
+                               password=make_password('secret-password'))
+
+    def import_text(self, text, fmt='jsonl'):
+        with UserImporter(workers=0) as importer:
+            return importer.run(read_rows(io.StringIO(text), fmt))
+
+    def test_bad_rows_are_reported_and_the_rest_imported(self):
+        importer = self.import_text(
+            '{"email": "one@example.com", "name": "Один", "last_name": 1, "password": 12345678, "role": "Клиент"}\n'
+            '{"email": "broken@example.com", "name": \n'
+            '\n'
+            '{"email": "short@example.com", "name": "Коротко", "last_name": "Пароль", "password": "1234567"}\n'
+            '["not", "an", "object"]\n'
+            '{"email": "one@example.com", "name": "Снова", "last_name": "Один", "password": "secret-password"}\n'
+            '{"email": "taken@example.com", "name": "Занят", "last_name": "Адрес", "password": "secret-password"}\n'
+        )
+
+        self.assertEqual((importer.created, importer.skipped), (1, 1))
+        self.assertEqual([error.split(':')[0] for error in importer.errors],
+                         ['строка 2', 'строка 4', 'строка 5', 'строка 6'])
+        self.assertIn('некорректный JSON', importer.errors[0])
+        self.assertIn('пароль короче 8 символов', importer.errors[1])
+        user = AppUser.objects.get(email='one@example.com')
+        self.assertEqual((user.last_name, user.role.name), ('1', 'Клиент'))
+        self.assertFalse(AppUser.objects.filter(email='short@example.com').exists())
+
+    def test_email_registered_during_import_is_skipped(self):
+        importer = UserImporter(workers=0)
+        hash_passwords = importer._hash_passwords
+
+        def register_meanwhile(passwords):
+            # Регистрация между проверкой занятых email и вставкой пакета
+            AppUser.objects.create(email='race@example.com', name='Успел', last_name='Первым', password='-')
+            return hash_passwords(passwords)
+
+        with mock.patch.object(importer, '_hash_passwords', register_meanwhile):
+            importer.run(read_rows(io.StringIO(
+                '{"email": "race@example.com", "name": "Гонка", "last_name": "Email", "password": "secret-password"}\n'
+                '{"email": "calm@example.com", "name": "Спокойный", "last_name": "Импорт", "password": "secret-password"}\n'
+            ), 'jsonl'))
+
+        self.assertEqual((importer.created, importer.skipped, importer.errors), (1, 1, []))
+        self.assertEqual(AppUser.objects.get(email='race@example.com').name, 'Успел')
+        self.assertTrue(AppUser.objects.filter(email='calm@example.com').exists())
+
+    def test_command_reads_stdin_without_closing_it(self):
+        stdin = io.StringIO(
+            '{"email": "stdin@example.com", "name": "Из", "last_name": "Потока", "password": "secret-password"}\n'
+            '{"email": "stdin@example.com", "name": "Не", "last_name": "Json"\n'
+        )
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with mock.patch('sys.stdin', stdin):
+            call_command('import_users', '-', format='jsonl', workers=0, stdout=stdout, stderr=stderr)
+
+        self.assertFalse(stdin.closed)
+        self.assertIn('Создано: 1', stdout.getvalue())
+        self.assertIn('строка 2: некорректный JSON', stderr.getvalue())
+
+    def test_csv_errors_point_at_file_lines(self):
+        importer = self.import_text(
+            'email,name,last_name,password\n'
+            'csv@example.com,Из,Файла,secret-password\n'
+            'bad-email,Без,Адреса,secret-password\n',
+            fmt='csv',
+        )
+
+        self.assertEqual(importer.created, 1)
+        self.assertEqual(importer.errors, ["строка 3: некорректный email 'bad-email'"])
+
+    def test_export_with_hashes_imports_back(self):
+        for fmt in ('csv', 'jsonl'):
+            with self.subTest(fmt=fmt):
+                stream = io.StringIO()
+                self.assertEqual(write_rows(stream, export_rows(include_password_hash=True), fmt, True), 1)
+                AppUser.objects.all().delete()
+
+                importer = self.import_text(stream.getvalue(), fmt)
+
+                self.assertEqual((importer.created, importer.errors), (1, []))
+                user = AppUser.objects.get(email='taken@example.com')
+                self.assertTrue(user.password.startswith('pbkdf2'))
+                self.assertTrue(LoginForm({'email': user.email, 'password': 'secret-password'}).is_valid())
+
+
+class BloomFilterTests(SimpleTestCase):
+
+    def test_no_false_negatives_and_bounded_error_rate(self):
+        bloom = BloomFilter(capacity=2000, error_rate=0.01)
+        for index in range(2000):
+            bloom.add(f'user{index}@example.com')
+
+        self.assertTrue(all(f'user{index}@example.com' in bloom for index in range(2000)))
+        false_positives = sum(f'free{index}@example.com' in bloom for index in range(10000))
+        self.assertLess(false_positives / 10000, 0.02)
+        self.assertAlmostEqual(bloom.estimated_error_rate(), 0.01, delta=0.005)
+
+
+@override_settings(EMAIL_INDEX={'ENABLED': True, 'CAPACITY': 1000, 'ERROR_RATE': 0.01, 'SYNC_INTERVAL': 60})
+class EmailIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        AppUser.objects.create(email='taken@example.com', name='Занят', last_name='Адрес', password='-')
+
+    def test_free_email_is_answered_without_queries(self):
+        email_exists('warmup@example.com')
+        negatives = email_checks.value('negative')
+
+        with self.assertNumQueries(0):
+            self.assertFalse(email_exists('free@example.com'))
+        self.assertEqual(email_checks.value('negative'), negatives + 1)
+        with self.assertNumQueries(1):
+            self.assertTrue(email_exists('taken@example.com'))
+
+        # Сохранение в этом воркере попадает в фильтр сразу
+        AppUser.objects.create(email='new@example.com', name='Новый', last_name='Адрес', password='-')
+        self.assertTrue(email_exists('new@example.com'))
+
+    @override_settings(EMAIL_INDEX={'ENABLED': True, 'CAPACITY': 1000, 'ERROR_RATE': 0.01, 'SYNC_INTERVAL': 0})
+    def test_saves_in_other_workers_do_not_rebuild_filter(self):
+        # Отдельный экземпляр — фильтр другого воркера: post_save его не трогает
+        other = EmailIndex()
+        self.assertTrue(other.might_contain('taken@example.com'))
+        rebuilds, delta_syncs = email_index_rebuilds.value(), email_index_delta_syncs.value()
+
+        for index in range(5):
+            with self.captureOnCommitCallbacks(execute=True):
+                AppUser.objects.create(email=f'new{index}@example.com', name='Новый', last_name='Адрес', password='-')
+            self.assertTrue(other.might_contain(f'new{index}@example.com'))
+        user = AppUser.objects.get(email='taken@example.com')
+        user.email = 'changed@example.com'
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save(update_fields=['email'])
+        self.assertTrue(other.might_contain('changed@example.com'))
+
+        self.assertEqual(email_index_rebuilds.value(), rebuilds)
+        self.assertEqual(email_index_delta_syncs.value(), delta_syncs + 6)
+        # Без новых сохранений проверка не догружает ничего
+        with self.assertNumQueries(2):
+            self.assertFalse(other.might_contain('free@example.com'))
+
+        # Массовый импорт и архивация по-прежнему пересобирают фильтр
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_generation(EMAIL_GENERATION)
+        other.might_contain('free@example.com')
+        self.assertEqual(email_index_rebuilds.value(), rebuilds + 1)
+
+    def test_profile_email_taken_concurrently_is_reported(self):
+        user = AppUser.objects.create(email='owner@example.com', name='Ольга', last_name='Иванова', password='-')
+        client = self.client_class(HTTP_AUTHORIZATION=f'Bearer {user.generate_jwt_token()}')
+        # Форма не видит занятый адрес: его заняли после проверки
+        with mock.patch('auth_form_test.forms.email_exists', return_value=False):
+            response = client.post(reverse('update_profile'), {
+                'email': 'taken@example.com', 'name': 'Ольга', 'last_name': 'Петрова',
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([str(message) for message in get_messages(response.wsgi_request)],
+                         ['Пользователь с таким email уже существует'])
+        user.refresh_from_db()
+        self.assertEqual((user.email, user.last_name), ('owner@example.com', 'Иванова'))
+
+    def test_check_email_endpoint(self):
+        url = reverse('check_email')
+        self.assertEqual(self.client.get(url, {'email': 'taken@example.com'}).json()['available'], False)
+        self.assertEqual(self.client.get(url, {'email': 'free@example.com'}).json()['available'], True)
+        self.assertEqual(self.client.get(url, {'email': 'not-an-email'}).status_code, 400)
+
+
+async def slow_async_view(request):
+    await asyncio.sleep(0.3)
+    return HttpResponse('ok')
+
+
+# ROOT_URLCONF для асинхронных тестов: вход, регистрация и смена данных —
+# версии из views_async, как под ASGI
+urlpatterns = [
+    path('slow/', slow_async_view, name='slow'),
+    path('login/', views_async.login_view, name='login'),
+    path('register/', views_async.register, name='register'),
+    path('update-profile/', views_async.update_profile, name='update_profile'),
+    path('', include('test_task.urls')),
+]
+
+
+@override_settings(ROOT_URLCONF='auth_form_test.tests')
+class AsyncMiddlewareTests(TestCase):
+
+    async def test_concurrent_requests_overlap(self):
+        client = AsyncClient()
+        # Ни одна middleware не оборачивается в «Synchronous/Asynchronous handler adapted»
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(client.get('/slow/') for _ in range(4)))
+            elapsed = time.perf_counter() - started
+
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        # По очереди (синхронная middleware) было бы не меньше 1.2 с
+        self.assertLess(elapsed, 0.9)
+
+
+@override_settings(ROOT_URLCONF='auth_form_test.tests', PASSWORD_HASHER_PROFILE='fast', READ_REPLICAS=[])
+class AsyncAuthViewsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AppUser.objects.create(email='async@example.com', name='Ольга', last_name='Иванова',
+                                          password=make_password('secret-password'))
+
+    def setUp(self):
+        reset_backend()
+        self.addCleanup(reset_backend)
+
+    async def test_login(self):
+        response = await self.async_client.post('/login/', {'email': 'async@example.com', 'password': 'wrong-password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('auth_token', response.cookies)
+
+        response = await self.async_client.post('/login/', {'email': 'async@example.com', 'password': 'secret-password'})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(decode_token(response.cookies['auth_token'].value)['user_id'], str(self.user.id))
+
+    async def test_register(self):
+        response = await self.async_client.post('/register/', {
+            'email': 'new@example.com', 'name': 'Новый', 'last_name': 'Пользователь',
+            'password': 'secret-password', 'password_confirm': 'secret-password',
+        })
+
+        self.assertRedirects(response, reverse('index'), fetch_redirect_response=False)
+        user = await AppUser.objects.aget(email='new@example.com')
+        self.assertTrue(check_password('secret-password', user.password))
+
+    async def test_update_profile(self):
+        response = await self.async_client.post('/update-profile/', {
+            'email': 'async@example.com', 'name': 'Ольга', 'last_name': 'Петрова',
+            'new_password': 'new-secret-password', 'new_password_confirm': 'new-secret-password',
+        }, headers={'Authorization': f'Bearer {self.user.generate_jwt_token()}'})
+
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        user = await AppUser.objects.aget(pk=self.user.pk)
+        self.assertEqual(user.last_name, 'Петрова')
+        self.assertTrue(check_password('new-secret-password', user.password))
+
+    async def test_full_hashing_pool_answers_503(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        with mock.patch.object(hashing_pool, 'max_pending', 1):
+            # Единственное место в очереди занято долгой задачей
+            hashing_pool.submit(release.wait, 5)
+            response = await self.async_client.post('/register/', {
+                'email': 'busy@example.com', 'name': 'Занят', 'last_name': 'Пул',
+                'password': 'secret-password', 'password_confirm': 'secret-password',
+            })
+            release.set()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertContains(response, OVERLOADED_MESSAGE, status_code=503)
+        self.assertFalse(await AppUser.objects.filter(email='busy@example.com').aexists())
+
+@override_settings(ROOT_URLCONF='auth_form_test.tests', PASSWORD_HASHER_PROFILE='fast')
+class AsyncMetricsTests(TransactionTestCase):
+
+    def test_queries_in_sync_to_async_threads_are_counted(self):
+        AppUser.objects.create(email='async@example.com', name='Ольга', last_name='Иванова',
+                               password=make_password('secret-password'))
+        before = sql_queries_total.value('login')
+
+        async def login():
+            response = await AsyncClient().post('/login/', {
+                'email': 'async@example.com', 'password': 'secret-password',
+            })
+            # Соединение потока sync_to_async закрываем в нём же
+            await sync_to_async(connections.close_all)()
+            return response
+
+        # Без async_to_sync тестов sync_to_async уходит в отдельный поток со своими соединениями
+        response = asyncio.run(login())
+
+        self.assertEqual(response.status_code, 302)
+        self.assertGreater(sql_queries_total.value('login') - before, 0)
+
+
+def load_settings(**environ):
+    # settings.py читает окружение при импорте — выполняем его заново
+    with mock.patch.dict(os.environ, environ):
+        return runpy.run_path(os.path.join(settings.BASE_DIR, 'test_task', 'settings.py'))
+
+
+class TemplatePrecompileTests(TestCase):
+
+    def setUp(self):
+        self.production_templates = load_settings(DJANGO_TEMPLATE_MODE='production')['TEMPLATES']
+
+    def test_production_mode_selects_cached_loader(self):
+        options = self.production_templates[0]['OPTIONS']
+
+        self.assertEqual(options['loaders'][0][0], 'django.template.loaders.cached.Loader')
+        self.assertFalse(options['debug'])
+        self.assertFalse(self.production_templates[0]['APP_DIRS'])
+        development = load_settings(DJANGO_TEMPLATE_MODE='development')['TEMPLATES'][0]
+        self.assertNotIn('loaders', development['OPTIONS'])
+
+    def test_warm_templates_fills_cached_loader(self):
+        with override_settings(TEMPLATES=self.production_templates):
+            engine = template_engines['django']
+            self.assertTrue(uses_cached_loader(engine))
+            loader = engine.engine.template_loaders[0]
+            self.assertEqual(loader.get_template_cache, {})
+
+            self.assertEqual(warm_templates(), {})
+
+            self.assertLessEqual(set(iter_template_names()), set(loader.get_template_cache))
+            with mock.patch('django.template.loaders.filesystem.Loader.get_contents') as get_contents:
+                engine.get_template('auth_form_test/login.html')
+            get_contents.assert_not_called()
+
+    def test_command_warns_only_without_cached_loader(self):
+        # Без явных loaders Django сам оборачивает их в кэширующий, поэтому
+        # предупреждение возможно только при явном списке без кэша
+        uncached = [{
+            **self.production_templates[0],
+            'OPTIONS': {**self.production_templates[0]['OPTIONS'], 'loaders': settings.TEMPLATE_LOADERS},
+        }]
+        out = io.StringIO()
+        with override_settings(TEMPLATES=uncached):
+            call_command('warm_templates', stdout=out)
+        self.assertIn('DJANGO_TEMPLATE_MODE=production', out.getvalue())
+
+        out = io.StringIO()
+        with override_settings(TEMPLATES=self.production_templates):
+            call_command('warm_templates', stdout=out)
+            loader = template_engines['django'].engine.template_loaders[0]
+            self.assertIn('auth_form_test/dahboard.html', loader.get_template_cache)
+        self.assertIn('Скомпилировано шаблонов', out.getvalue())
+        self.assertNotIn('DJANGO_TEMPLATE_MODE=production', out.getvalue())
+
+
+
+class SlimAppsTests(TestCase):
+
+    def setUp(self):
+        slim = load_settings(DJANGO_SLIM_APPS='1')
+        self.slim_settings = {name: slim[name] for name in ('INSTALLED_APPS', 'MIDDLEWARE', 'TEMPLATES')}
+
+    def test_slim_mode_drops_admin_auth_and_contenttypes(self):
+        self.assertEqual(self.slim_settings['INSTALLED_APPS'], [
+            'django.contrib.sessions',
+            'django.contrib.messages',
+            'django.contrib.staticfiles',
+            'auth_form_test',
+        ])
+        self.assertNotIn('django.contrib.auth.middleware.AuthenticationMiddleware',
+                         self.slim_settings['MIDDLEWARE'])
+        self.assertNotIn('django.contrib.auth.context_processors.auth',
+                         self.slim_settings['TEMPLATES'][0]['OPTIONS']['context_processors'])
+        self.assertIn('django.contrib.auth', load_settings(DJANGO_SLIM_APPS='0')['INSTALLED_APPS'])
+
+    @override_settings(PASSWORD_HASHER_PROFILE='fast', READ_REPLICAS=[])
+    def test_views_work_without_removed_apps(self):
+        with override_settings(**self.slim_settings):
+            self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+            response = self.client.post(reverse('register'), {
+                'email': 'slim@example.com', 'name': 'Ольга', 'last_name': 'Иванова',
+                'password': 'secret-password', 'password_confirm': 'secret-password',
+            })
+            self.assertRedirects(response, reverse('index'), fetch_redirect_response=False)
+
+            response = self.client.post(reverse('login'), {
+                'email': 'slim@example.com', 'password': 'secret-password',
+            })
+            self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+            response = self.client.get(reverse('dashboard'))
+            self.assertContains(response, 'slim@example.com')
+            self.assertIsInstance(response.context['user'], AppUser)
@@ -0,0 +1,236 @@
+# auth_form_test/throttling.py
+import hashlib
+import itertools
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .metrics import registry
+from .sqlite import apply_pragmas
+
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+login_throttled = registry.counter(
+    'auth_login_throttled_total',
+    'Запросы, отклонённые ограничением частоты (вход по ip/email, проверка email_check)', ('scope',),
+)
+
+
+def parse_rate(rate):
+    """'5/min' -> (ёмкость бакета, пополнение в токенах за секунду)."""
+    count, _, period = rate.partition('/')
+    count = int(count)
+    seconds = PERIODS[period.strip().lower()]
+    return count, count / seconds
+
+
+def take_token(state, now, capacity, rate):
+    """
+    Один шаг token bucket.
+
+    state — (tokens, updated) или None для нового ключа. Возвращает
+    (разрешено, через сколько секунд повторить, новое состояние, когда
+    бакет снова наполнится и запись можно забыть).
+    """
+    if state is None:
+        tokens = float(capacity)
+    else:
+        tokens = min(float(capacity), state[0] + (now - state[1]) * rate)
+    if tokens >= 1:
+        allowed, retry_after, tokens = True, 0.0, tokens - 1
+    else:
+        allowed, retry_after = False, (1 - tokens) / rate
+    return allowed, retry_after, (tokens, now), now + (capacity - tokens) / rate
+
+
+class LocMemThrottleBackend:
+    """
+    Бакеты в памяти процесса: LRU не больше max_entries ключей.
+
+    Запись удаляется, как только бакет наполнился бы заново, — она ничем
+    не отличается от отсутствующей.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def consume(self, key, capacity, rate, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expire(now)
+            entry = self._buckets.pop(key, None)
+            allowed, retry_after, state, expires = take_token(
+                entry[:2] if entry else None, now, capacity, rate
+            )
+            self._buckets[key] = (*state, expires)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def _expire(self, now):
+        # Спереди — давно не использованные ключи
+        while self._buckets:
+            key, entry = next(iter(self._buckets.items()))
+            if entry[2] > now:
+                break
+            del self._buckets[key]
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteThrottleBackend:
+    """
+    Общие для всех воркеров бакеты в отдельном файле SQLite.
+
+    Каждое списание — короткая транзакция BEGIN IMMEDIATE, поэтому
+    конкурирующие воркеры не теряют попытки. Истёкшие записи удаляются
+    раз в prune_every списаний.
+    """
+
+    def __init__(self, path=None, prune_every=1000):
+        self.path = str(path or settings.BASE_DIR / 'throttle.sqlite3')
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._calls = itertools.count(1)
+
+    def _connection(self):
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            apply_pragmas(conn)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS throttle_buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                'updated REAL NOT NULL, expires REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS throttle_buckets_expires ON throttle_buckets (expires)')
+            self._local.connection = conn
+        return conn
+
+    def consume(self, key, capacity, rate, now=None):
+        now = time.time() if now is None else now
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT tokens, updated FROM throttle_buckets WHERE key = ? AND expires > ?', (key, now)
+            ).fetchone()
+            allowed, retry_after, (tokens, updated), expires = take_token(row, now, capacity, rate)
+            conn.execute(
+                'INSERT INTO throttle_buckets (key, tokens, updated, expires) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, '
+                'updated = excluded.updated, expires = excluded.expires',
+                (key, tokens, updated, expires),
+            )
+            if next(self._calls) % self.prune_every == 0:
+                conn.execute('DELETE FROM throttle_buckets WHERE expires <= ?', (now,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM throttle_buckets').fetchone()[0]
+
+    def reset(self, key):
+        self._connection().execute('DELETE FROM throttle_buckets WHERE key = ?', (key,))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM throttle_buckets')
+
+
+def get_throttle_settings():
+    return {
+        'ENABLED': True,
+        'BACKEND': 'auth_form_test.throttling.LocMemThrottleBackend',
+        'OPTIONS': {},
+        'RATES': {'ip': '30/min', 'email': '5/min', 'email_check': '60/min'},
+        **getattr(settings, 'LOGIN_THROTTLE', {}),
+    }
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = get_throttle_settings()
+                _backend = import_string(config['BACKEND'])(**config['OPTIONS'])
+    return _backend
+
+
+def reset_backend():
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+def _login_keys(request):
+    keys = {'ip': request.META.get('REMOTE_ADDR') or 'unknown'}
+    email = (request.POST.get('email') or '').strip().lower()
+    if email:
+        # В общем хранилище не держим адреса в открытом виде
+        keys['email'] = hashlib.sha256(email.encode()).hexdigest()[:32]
+    return keys
+
+
+def check_login_throttle(request):
+    """
+    Списывает по токену из бакетов IP и email попытки входа.
+
+    Вызывается до проверки пароля. Возвращает None, если попытка
+    разрешена, иначе — сколько секунд подождать.
+    """
+    config = get_throttle_settings()
+    if not config['ENABLED']:
+        return None
+    backend = get_backend()
+    retry_after = None
+    for scope, value in _login_keys(request).items():
+        rate = config['RATES'].get(scope)
+        if not rate:
+            continue
+        allowed, wait = backend.consume(f'login:{scope}:{value}', *parse_rate(rate))
+        if not allowed:
+            login_throttled.inc(scope)
+            retry_after = max(retry_after or 0.0, wait)
+    return retry_after
+
+
+def check_ip_throttle(request, scope):
+    """
+    Списывает токен из бакета scope для IP клиента (ставка — RATES[scope]).
+
+    Возвращает None, если запрос разрешён, иначе — сколько секунд подождать.
+    """
+    config = get_throttle_settings()
+    rate = config['RATES'].get(scope)
+    if not config['ENABLED'] or not rate:
+        return None
+    ip = request.META.get('REMOTE_ADDR') or 'unknown'
+    allowed, wait = get_backend().consume(f'{scope}:ip:{ip}', *parse_rate(rate))
+    if allowed:
+        return None
+    login_throttled.inc(scope)
+    return wait
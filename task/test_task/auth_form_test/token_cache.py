@@ -0,0 +1,127 @@
+# auth_form_test/token_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class VerifiedTokenCache:
+    """
+    LRU-кэш проверенных JWT: токен -> claims.
+
+    Запись живёт не дольше TTL и никогда не переживает exp самого токена.
+    revoke() сразу выкидывает токен из кэша и запоминает его до истечения
+    exp, чтобы повторная проверка подписи его не «воскресила».
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.revocations = 0
+
+    def get(self, token, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at = entry
+            if expires_at <= now:
+                del self._entries[token]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return claims
+
+    def set(self, token, claims, now=None):
+        now = time.time() if now is None else now
+        expires_at = min(claims['exp'], now + self.ttl)
+        if expires_at <= now:
+            return
+        with self._lock:
+            self._entries[token] = (claims, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def is_revoked(self, token, now=None):
+        if not self._revoked:
+            return False
+        now = time.time() if now is None else now
+        with self._lock:
+            expires_at = self._revoked.get(token)
+            if expires_at is None:
+                return False
+            if expires_at <= now:
+                del self._revoked[token]
+                return False
+            return True
+
+    def revoke(self, token, expires_at=None, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.pop(token, None)
+            if expires_at is None:
+                expires_at = entry[0]['exp'] if entry else now + self.ttl
+            self._revoked[token] = expires_at
+            self.revocations += 1
+            self._prune_revoked(now)
+
+    def revoke_user(self, user_id, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens = [
+                token for token, (claims, _) in self._entries.items()
+                if claims.get('user_id') == str(user_id)
+            ]
+            for token in tokens:
+                claims, _ = self._entries.pop(token)
+                self._revoked[token] = claims['exp']
+                self.revocations += 1
+            self._prune_revoked(now)
+
+    def _prune_revoked(self, now):
+        expired = [token for token, expires_at in self._revoked.items() if expires_at <= now]
+        for token in expired:
+            del self._revoked[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._revoked.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'revoked': len(self._revoked),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'revocations': self.revocations,
+            }
+
+
+def _build_cache():
+    config = getattr(settings, 'JWT_TOKEN_CACHE', {})
+    return VerifiedTokenCache(
+        max_size=config.get('MAX_SIZE', 1024),
+        ttl=config.get('TTL', 300),
+    )
+
+
+token_cache = _build_cache()
@@ -1,16 +1,23 @@
 
+from django.conf import settings
 from django.urls import path
 from . import views
-from django.contrib.auth import views as auth_views
+
+if getattr(settings, 'ASYNC_AUTH_VIEWS', False):
+    from . import views_async as auth_views_impl
+else:
+    auth_views_impl = views
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('about-us/', views.about, name='about'),
     path('dashboard/', views.dashboard1, name='dashboard'),
-    path('login/', views.login_view, name='login'),
-    path('register/', views.register, name='register'),
+    path('login/', auth_views_impl.login_view, name='login'),
+    path('register/', auth_views_impl.register, name='register'),
+    path('register/check-email/', views.check_email, name='check_email'),
     path('logout/', views.logout_view, name='logout'),
-    path('update-profile/', views.update_profile, name='update_profile'),
+    path('update-profile/', auth_views_impl.update_profile, name='update_profile'),
     path('deactivate-account/', views.deactivate_account, name='deactivate_account'),
+    path('internal/metrics/', views.metrics_view, name='metrics'),
 
 ]
\ No newline at end of file
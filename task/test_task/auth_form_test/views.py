@@ -1,36 +1,57 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.http import JsonResponse
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.core.validators import validate_email
+from django.http import JsonResponse, HttpResponse, Http404
 from .forms import UserRegistrationForm, LoginForm, UserUpdateForm
 from .models import AppUser, Role, BusinessElement, AccessRule
-from django.views.decorators.http import require_POST
-import jwt
-import datetime
+from .authentication import revoke_request_token
+from .token_cache import token_cache
+from .metrics import registry as metrics_registry, get_metrics_settings
+from .page_cache import render_cached
+from .throttling import check_ip_throttle, check_login_throttle
+from .email_index import email_exists
+from .request_user import get_request_user
+from django.views.decorators.http import require_GET, require_POST
+import logging
+import math
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+def _get_authenticated_user(request):
+    # Пользователь, роль и права роли — один раз на запрос
+    return get_request_user(request)
+
+
+def _is_authenticated(request):
+    return getattr(request, 'app_user', None) is not None or 'user_id' in request.session
+
 
 def index(request):
-    return render(request, 'auth_form_test/index.html')
+    return render_cached(request, 'auth_form_test/index.html')
 
 def about(request):
-    return render(request, 'auth_form_test/register.html')
+    return render_cached(request, 'auth_form_test/register.html')
 
 def api_demo(request):
-    return render(request, 'auth_form_test/api_demo.html')
+    return render_cached(request, 'auth_form_test/api_demo.html')
 
 def dashboard1(request):
-    if 'user_id' not in request.session:
+    if not _is_authenticated(request):
         messages.error(request, 'Пожалуйста, войдите в систему')
         return redirect('login')
-    user_id = request.session.get('user_id')
     try:
-        user = AppUser.objects.get(id=user_id)
-        if not user.isActive:
-            request.session.flush()
-            messages.error(request, 'Ваш аккаунт деактивирован')
-            return redirect('login')
+        user = _get_authenticated_user(request)
     except AppUser.DoesNotExist:
-        messages.error(request, 'Пользователь не найден')
-        return redirect('login')
+        # Менеджер active не возвращает деактивированные аккаунты
+        request.session.flush()
+        messages.error(request, 'Пользователь не найден или деактивирован')
+        response = redirect('login')
+        response.delete_cookie('auth_token')
+        return response
     return render(request, 'auth_form_test/dahboard.html', {
         'user': user
     })
@@ -39,59 +60,81 @@ def login_view(request):
     if 'user_id' in request.session:
         return redirect('dashboard')
     if request.method == 'POST':
+        # До LoginForm.clean: перебор паролей не должен доходить до PBKDF2
+        retry_after = check_login_throttle(request)
+        if retry_after is not None:
+            return login_throttled(request, retry_after)
         form = LoginForm(request.POST)
         if form.is_valid():
-            user = form.cleaned_data['user']
-            if not user.isActive:
-                messages.error(request, 'Ваш аккаунт деактивирован. Обратитесь к администратору.')
-                return render(request, 'auth_form_test/login.html', {'form': form})
-            request.session['user_id'] = str(user.id)
-            request.session['user_email'] = user.email
-            request.session['user_name'] = user.name
-            try:
-                token = user.generate_jwt_token()
-            except Exception as e:
-                print(f"Ошибка генерации JWT: {e}")
-                token = f"session-{user.id}"
-            messages.success(request, f'Добро пожаловать, {user.name}!')
-            is_api_request = request.headers.get('Content-Type') == 'application/json'
-            if is_api_request:
-                return JsonResponse({
-                    'success': True,
-                    'message': 'Вход выполнен успешно',
-                    'token': token,
-                    'user': {
-                        'id': str(user.id),
-                        'email': user.email,
-                        'name': user.name,
-                        'last_name': user.last_name,
-                        'role': user.role.name if user.role else None
-                    }
-                })
-            else:
-                response = redirect('dashboard')
-                response.set_cookie('auth_token', token, httponly=False,
-                                    max_age=7 * 24 * 60 * 60)
-                request.session['jwt_token'] = token
-                return response
-        else:
-            error_messages = []
-            for field, errors in form.errors.items():
-                for error in errors:
-                    error_messages.append(f'{error}')
-            if request.headers.get('Content-Type') == 'application/json':
-                return JsonResponse({
-                    'success': False,
-                    'errors': error_messages
-                }, status=400)
-            for field, errors in form.errors.items():
-                for error in errors:
-                    messages.error(request, f'{error}')
+            return login_success(request, form)
+        return login_failure(request, form)
+    return render_cached(request, 'auth_form_test/login.html', lambda: {'form': LoginForm()})
+
+def login_throttled(request, retry_after):
+    message = 'Слишком много попыток входа. Повторите попытку позже'
+    if request.headers.get('Content-Type') == 'application/json':
+        response = JsonResponse({
+            'success': False,
+            'errors': [message]
+        }, status=429)
     else:
-        form = LoginForm()
+        # Форма не валидируется: clean() проверял бы пароль
+        form = LoginForm(initial={'email': request.POST.get('email', '')})
+        form.errors[NON_FIELD_ERRORS] = form.error_class([message])
+        response = render(request, 'auth_form_test/login.html', {'form': form}, status=429)
+    response['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
+def login_success(request, form):
+    # Деактивированных отсеивает LoginForm: пользователь выбирается через AppUser.active
+    user = form.cleaned_data['user']
+    request.session['user_id'] = str(user.id)
+    request.session['user_email'] = user.email
+    request.session['user_name'] = user.name
+    try:
+        token = user.generate_jwt_token()
+    except Exception:
+        logger.exception('Ошибка генерации JWT для пользователя %s', user.id)
+        token = f"session-{user.id}"
+    messages.success(request, f'Добро пожаловать, {user.name}!')
+    is_api_request = request.headers.get('Content-Type') == 'application/json'
+    if is_api_request:
+        return JsonResponse({
+            'success': True,
+            'message': 'Вход выполнен успешно',
+            'token': token,
+            'user': {
+                'id': str(user.id),
+                'email': user.email,
+                'name': user.name,
+                'last_name': user.last_name,
+                'role': user.role.name if user.role else None
+            }
+        })
+    else:
+        response = redirect('dashboard')
+        response.set_cookie('auth_token', token, httponly=False,
+                            max_age=7 * 24 * 60 * 60)
+        request.session['jwt_token'] = token
+        return response
+
+def login_failure(request, form):
+    error_messages = []
+    for field, errors in form.errors.items():
+        for error in errors:
+            error_messages.append(f'{error}')
+    if request.headers.get('Content-Type') == 'application/json':
+        return JsonResponse({
+            'success': False,
+            'errors': error_messages
+        }, status=400)
+    for field, errors in form.errors.items():
+        for error in errors:
+            messages.error(request, f'{error}')
     return render(request, 'auth_form_test/login.html', {'form': form})
 
 def logout_view(request):
+    revoke_request_token(request)
     request.session.flush()
     if request.headers.get('Content-Type') == 'application/json':
         response = JsonResponse({
@@ -109,51 +152,66 @@ def register(request):
     if request.method == 'POST':
         form = UserRegistrationForm(request.POST)
         if form.is_valid():
-            try:
-                user = form.save()
-                messages.success(
-                    request,
-                    f'✅ Пользователь {user.name} {user.last_name} успешно зарегистрирован!'
-                )
-                return redirect('index')
-            except Exception as e:
-                messages.error(request, f'❌ Ошибка при сохранении: {str(e)}')
-        else:
-            for field, errors in form.errors.items():
-                for error in errors:
-                    messages.error(request, f'{error}')
-    else:
-        form = UserRegistrationForm()
+            return register_save(request, form)
+        return form_errors(request, form, 'auth_form_test/register.html')
+    return render_cached(request, 'auth_form_test/register.html', lambda: {'form': UserRegistrationForm()})
+
+def register_save(request, form, password_hash=None):
+    try:
+        user = form.save(password_hash=password_hash)
+        messages.success(
+            request,
+            f'✅ Пользователь {user.name} {user.last_name} успешно зарегистрирован!'
+        )
+        return redirect('index')
+    except IntegrityError:
+        # Email заняли между проверкой формы и сохранением
+        messages.error(request, 'Пользователь с таким email уже существует')
+    except Exception as e:
+        messages.error(request, f'❌ Ошибка при сохранении: {str(e)}')
     return render(request, 'auth_form_test/register.html', {'form': form})
 
-def update_profile(request):
-    if 'user_id' not in request.session:
+def form_errors(request, form, template_name, context=None):
+    for field, errors in form.errors.items():
+        for error in errors:
+            messages.error(request, f'{error}')
+    return render(request, template_name, {'form': form, **(context or {})})
+
+@require_GET
+def check_email(request):
+    # Проверка занятости email со страницы регистрации; «свободен» чаще
+    # всего отвечается фильтром Блума без запроса к БД
+    retry_after = check_ip_throttle(request, 'email_check')
+    if retry_after is not None:
+        response = JsonResponse({'error': 'Слишком много запросов'}, status=429)
+        response['Retry-After'] = str(math.ceil(retry_after))
+        return response
+    email = request.GET.get('email', '').strip()
+    try:
+        validate_email(email)
+    except ValidationError:
+        return JsonResponse({'email': email, 'error': 'Введите правильный email'}, status=400)
+    return JsonResponse({'email': email, 'available': not email_exists(email)})
+
+def _load_profile_user(request):
+    if not _is_authenticated(request):
         messages.error(request, 'Пожалуйста, войдите в систему')
-        return redirect('login')
-    user_id = request.session.get('user_id')
+        return None, redirect('login')
     try:
-        user = AppUser.objects.get(id=user_id)
+        return _get_authenticated_user(request), None
     except AppUser.DoesNotExist:
         messages.error(request, 'Пользователь не найден')
-        return redirect('login')
+        return None, redirect('login')
+
+def update_profile(request):
+    user, response = _load_profile_user(request)
+    if response is not None:
+        return response
     if request.method == 'POST':
         form = UserUpdateForm(request.POST, user=user)
         if form.is_valid():
-            try:
-                updated_user = form.save()
-                request.session['user_email'] = updated_user.email
-                request.session['user_name'] = updated_user.name
-                messages.success(
-                    request,
-                    '✅ Ваши данные успешно обновлены!'
-                )
-                return redirect('dashboard')
-            except Exception as e:
-                messages.error(request, f'❌ Ошибка при сохранении: {str(e)}')
-        else:
-            for field, errors in form.errors.items():
-                for error in errors:
-                    messages.error(request, f'{error}')
+            return update_profile_save(request, form)
+        return form_errors(request, form, 'auth_form_test/change_user_data.html', {'user': user})
     else:
         form = UserUpdateForm(user=user)
     return render(request, 'auth_form_test/change_user_data.html', {
@@ -161,27 +219,59 @@ def update_profile(request):
         'user': user
     })
 
+def update_profile_save(request, form, password_hash=None):
+    try:
+        # Отдельная точка сохранения: после IntegrityError запросы продолжают работать
+        with transaction.atomic():
+            updated_user = form.save(password_hash=password_hash)
+        request.session['user_email'] = updated_user.email
+        request.session['user_name'] = updated_user.name
+        messages.success(
+            request,
+            '✅ Ваши данные успешно обновлены!'
+        )
+        return redirect('dashboard')
+    except IntegrityError:
+        # Email заняли между проверкой формы и сохранением
+        form.user.refresh_from_db()
+        messages.error(request, 'Пользователь с таким email уже существует')
+    except Exception as e:
+        messages.error(request, f'❌ Ошибка при сохранении: {str(e)}')
+    return render(request, 'auth_form_test/change_user_data.html', {
+        'form': form,
+        'user': form.user
+    })
+
 def deactivate_account(request):
-    if 'user_id' not in request.session:
+    if not _is_authenticated(request):
         messages.error(request, 'Пожалуйста, войдите в систему')
         return redirect('login')
     if request.method == 'POST':
         try:
-            user_id = request.session.get('user_id')
-            user_obj = AppUser.objects.get(id=user_id)
-            if not user_obj.isActive:
-                messages.warning(request, 'Аккаунт уже деактивирован')
-                request.session.flush()
-                return redirect('login')
+            user_obj = _get_authenticated_user(request)
             user_obj.isActive = False
-            user_obj.save()
+            user_obj.deactivated_at = timezone.now()
+            user_obj.save(update_fields=['isActive', 'deactivated_at'])
+            revoke_request_token(request)
+            token_cache.revoke_user(user_obj.id)
             request.session.flush()
             messages.success(request, 'Ваш аккаунт был успешно деактивирован')
-            return redirect('login')
+            response = redirect('login')
+            response.delete_cookie('auth_token')
+            return response
         except AppUser.DoesNotExist:
             messages.error(request, 'Пользователь не найден')
             return redirect('dashboard')
         except Exception as e:
             messages.error(request, f'Произошла ошибка: {str(e)}')
             return redirect('dashboard')
-    return redirect('dashboard')
\ No newline at end of file
+    return redirect('dashboard')
+
+def metrics_view(request):
+    # Внутренний эндпоинт для Prometheus, доступен только с разрешённых адресов
+    if request.META.get('REMOTE_ADDR') not in get_metrics_settings()['ALLOWED_IPS']:
+        raise Http404
+    return HttpResponse(
+        metrics_registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
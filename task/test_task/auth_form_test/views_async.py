@@ -0,0 +1,91 @@
+# auth_form_test/views_async.py
+# Асинхронные версии входа, регистрации и смены данных для ASGI.
+# Запросы к БД выполняются через sync_to_async, а PBKDF2 — в пуле hashing_pool,
+# поэтому event loop не блокируется на время вычисления хеша.
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.shortcuts import render
+
+from . import views
+from .forms import LoginForm, UserRegistrationForm, UserUpdateForm
+from .hashing import (
+    HashingOverloaded, acheck_password, amake_password, password_upgrade_setter,
+)
+from .throttling import check_login_throttle
+
+
+OVERLOADED_MESSAGE = 'Сервер перегружен, повторите попытку через несколько секунд'
+
+
+def _overloaded(request, form, template_name, context=None):
+    if request.headers.get('Content-Type') == 'application/json':
+        response = JsonResponse({
+            'success': False,
+            'errors': [OVERLOADED_MESSAGE]
+        }, status=503)
+    else:
+        form.add_error(None, OVERLOADED_MESSAGE)
+        response = render(request, template_name, {'form': form, **(context or {})}, status=503)
+    response['Retry-After'] = '1'
+    return response
+
+
+async def login_view(request):
+    if request.method != 'POST' or await request.session.ahas_key('user_id'):
+        return await sync_to_async(views.login_view)(request)
+
+    retry_after = await sync_to_async(check_login_throttle)(request)
+    if retry_after is not None:
+        return await sync_to_async(views.login_throttled)(request, retry_after)
+    form = LoginForm(request.POST, verify_password=False)
+    if await sync_to_async(form.is_valid)():
+        user = form.cleaned_data['user']
+        try:
+            password_ok = await acheck_password(
+                form.cleaned_data['password'], user.password, password_upgrade_setter(user)
+            )
+        except HashingOverloaded:
+            return _overloaded(request, form, 'auth_form_test/login.html')
+        if password_ok:
+            return await sync_to_async(views.login_success)(request, form)
+        form.add_error(None, 'Неверный email или пароль')
+    return await sync_to_async(views.login_failure)(request, form)
+
+
+async def register(request):
+    if request.method != 'POST':
+        return await sync_to_async(views.register)(request)
+
+    form = UserRegistrationForm(request.POST)
+    if not await sync_to_async(form.is_valid)():
+        return await sync_to_async(views.form_errors)(
+            request, form, 'auth_form_test/register.html'
+        )
+    try:
+        password_hash = await amake_password(form.cleaned_data['password'])
+    except HashingOverloaded:
+        return _overloaded(request, form, 'auth_form_test/register.html')
+    return await sync_to_async(views.register_save)(request, form, password_hash)
+
+
+async def update_profile(request):
+    if request.method != 'POST':
+        return await sync_to_async(views.update_profile)(request)
+
+    user, response = await sync_to_async(views._load_profile_user)(request)
+    if response is not None:
+        return response
+    form = UserUpdateForm(request.POST, user=user)
+    if not await sync_to_async(form.is_valid)():
+        return await sync_to_async(views.form_errors)(
+            request, form, 'auth_form_test/change_user_data.html', {'user': user}
+        )
+    password_hash = None
+    if form.cleaned_data.get('new_password'):
+        try:
+            password_hash = await amake_password(form.cleaned_data['new_password'])
+        except HashingOverloaded:
+            return _overloaded(
+                request, form, 'auth_form_test/change_user_data.html', {'user': user}
+            )
+    return await sync_to_async(views.update_profile_save)(request, form, password_hash)
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_task.settings')
+# Под ASGI вход и регистрация обслуживаются асинхронно: хеширование паролей
+# уходит в пул потоков и не блокирует event loop
+os.environ.setdefault('DJANGO_ASYNC_AUTH_VIEWS', '1')
 
 application = get_asgi_application()
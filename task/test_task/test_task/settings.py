@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -30,6 +31,15 @@ ALLOWED_HOSTS = []
 
 # Application definition
 
+# Облегчённая конфигурация для быстрого старта воркеров: без admin,
+# auth и contenttypes (приложение их не использует) и их middleware
+SLIM_APPS = os.environ.get('DJANGO_SLIM_APPS') == '1'
+SLIM_EXCLUDED_APPS = (
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+)
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -41,23 +51,41 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'auth_form_test.metrics.MetricsMiddleware',
+    'auth_form_test.routers.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'auth_form_test.authentication.JWTAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'auth_form_test.middleware.AclGenerationMiddleware',
 
 ]
 
+if SLIM_APPS:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in SLIM_EXCLUDED_APPS]
+    MIDDLEWARE.remove('django.contrib.auth.middleware.AuthenticationMiddleware')
+
 ROOT_URLCONF = 'test_task.urls'
 
+# production: шаблоны компилируются при старте воркера (см. auth_form_test/template_cache.py)
+# и дальше берутся из памяти без проверки файлов; development — обычная загрузка
+TEMPLATE_MODE = os.environ.get('DJANGO_TEMPLATE_MODE', 'development')
+PRECOMPILE_TEMPLATES = TEMPLATE_MODE == 'production'
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
+        'APP_DIRS': not PRECOMPILE_TEMPLATES,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
@@ -68,6 +96,15 @@ TEMPLATES = [
     },
 ]
 
+if SLIM_APPS:
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove('django.contrib.auth.context_processors.auth')
+
+if PRECOMPILE_TEMPLATES:
+    TEMPLATES[0]['OPTIONS'].update({
+        'debug': False,
+        'loaders': [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
+    })
+
 WSGI_APPLICATION = 'test_task.wsgi.application'
 
 
@@ -77,10 +114,148 @@ WSGI_APPLICATION = 'test_task.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DJANGO_DATABASE_PATH', BASE_DIR / 'db.sqlite3'),
+        # Соединение переиспользуется между запросами одного воркера
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Секунды ожидания блокировки на уровне драйвера sqlite3
+            'timeout': 5,
+            # Писатель сразу берёт RESERVED-блокировку: без взаимоблокировок
+            # при повышении уровня блокировки внутри транзакции
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Локальная реплика для чтения: путь к второму файлу SQLite. Файл должен
+# содержать копию основной базы (реальная репликация — вне приложения).
+REPLICA_DATABASE_PATH = os.environ.get('DJANGO_REPLICA_DB')
+if REPLICA_DATABASE_PATH:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': REPLICA_DATABASE_PATH,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['auth_form_test.routers.ReadReplicaRouter']
+# Сколько секунд после записи клиент читает с основной базы
+REPLICA_PIN_SECONDS = 5
+
+# PRAGMA для каждого нового соединения SQLite — auth_form_test.sqlite.DEFAULT_PRAGMAS;
+# переопределяются словарём SQLITE_PRAGMAS целиком
+
+
+# Общий счётчик поколений правил доступа: воркеры перечитывают матрицу прав,
+# только когда он изменился. Для нескольких воркеров на одной машине можно
+# использовать 'auth_form_test.generation.FileGenerationBackend'.
+GENERATION_BACKEND = {
+    'BACKEND': 'auth_form_test.generation.DatabaseGenerationBackend',
+    'OPTIONS': {},
+}
+
+
+# Кэш проверенных JWT (см. auth_form_test/token_cache.py)
+JWT_TOKEN_CACHE = {
+    'MAX_SIZE': 1024,
+    'TTL': 300,
+}
+
+
+# Метрики запросов (см. auth_form_test/metrics.py), отдаются на /internal/metrics/
+METRICS = {
+    'SAMPLE_RATE': 1.0,
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+}
+
+# Кэш готового HTML статичных страниц (см. auth_form_test/page_cache.py).
+# Бэкенд: DJANGO_PAGE_CACHE_BACKEND=locmem (по умолчанию) или file
+PAGE_CACHE_BACKEND = os.environ.get('DJANGO_PAGE_CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.page_cache',
+    } if PAGE_CACHE_BACKEND == 'file' else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pages',
+    },
+}
+
+PAGE_CACHE = {
+    'ENABLED': True,
+    'ALIAS': 'pages',
+    'TIMEOUT': 600,
+}
+
+# Сессии: db — таблица django_session (SELECT на каждый запрос, UPDATE при
+# изменении); signed — подписанная сжатая cookie без обращений к таблице,
+# выход отзывает её через revoked_sessions (auth_form_test/session_store.py).
+# Со signed проверка отзыва читает счётчик поколений: с FileGenerationBackend
+# это не стоит ни одного запроса. Сравнение: python manage.py bench_sessions
+SESSION_MODE = os.environ.get('DJANGO_SESSION_MODE', 'db')
+if SESSION_MODE == 'signed':
+    SESSION_ENGINE = 'auth_form_test.session_store'
+
+# Ограничение частоты попыток входа (token bucket по IP и по email),
+# проверяется до хеширования пароля. Для нескольких воркеров —
+# общий бакет в SQLite: auth_form_test.throttling.SQLiteThrottleBackend
+LOGIN_THROTTLE = {
+    'ENABLED': True,
+    'BACKEND': 'auth_form_test.throttling.LocMemThrottleBackend',
+    'OPTIONS': {'max_entries': 10000},
+    'RATES': {
+        'ip': '30/min',
+        'email': '5/min',
+        # Проверка занятости email со страницы регистрации (по IP)
+        'email_check': '60/min',
+    },
+}
+
+# Фильтр Блума по email (auth_form_test/email_index.py): «точно свободен»
+# отвечается без запроса к БД, «возможно занят» проверяется в БД
+EMAIL_INDEX = {
+    'ENABLED': True,
+    'CAPACITY': 100000,
+    'ERROR_RATE': 0.01,
+    'SYNC_INTERVAL': 1.0,
+}
+
+# Асинхронные login/register/update_profile (включаются из asgi.py)
+ASYNC_AUTH_VIEWS = os.environ.get('DJANGO_ASYNC_AUTH_VIEWS') == '1'
+
+# Пул потоков для хеширования паролей в асинхронных представлениях.
+# При MAX_PENDING задачах в очереди новые запросы получают 503.
+PASSWORD_HASHING_POOL = {
+    'MAX_WORKERS': 4,
+    'MAX_PENDING': 64,
+}
+
+
+# Профили стоимости хеширования паролей. Профиль выбирается переменной
+# окружения; при входе хеши с меньшим числом итераций перехешируются в фоне
+# (более дешёвый профиль существующие хеши не понижает).
+# 'fast' — только для тестов и локальной разработки.
+PASSWORD_HASHER_PROFILES = {
+    'default': {'ITERATIONS': 1_000_000},
+    'low-latency': {'ITERATIONS': 600_000},
+    'fast': {'ITERATIONS': 1},
+}
+PASSWORD_HASHER_PROFILE = os.environ.get('DJANGO_PASSWORD_HASHER_PROFILE', 'default')
+PASSWORD_REHASH_IN_BACKGROUND = True
+
+PASSWORD_HASHERS = [
+    'auth_form_test.hashers.ProfilePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -117,12 +292,30 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = '/static/'
-STATICFILES_DIRS = [
-    BASE_DIR / 'auth_from_test' / 'static',  # путь к статике в приложении
-]
+# auth_form_test/static находит AppDirectoriesFinder, отдельные каталоги не нужны
+STATICFILES_DIRS = []
 
 # Для продакшена (опционально)
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Сборка: python manage.py build_static (минификация, хеш в имени, .gz/.br).
+# С DJANGO_STATIC_PIPELINE=1 шаблоны ссылаются на хешированные файлы,
+# а /static/ отдаётся из STATIC_ROOT с Cache-Control на STATIC_MAX_AGE
+STATIC_PIPELINE = os.environ.get('DJANGO_STATIC_PIPELINE') == '1'
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+STATIC_PIPELINE_STORAGE = {
+    'BACKEND': 'auth_form_test.staticfiles.CompressedManifestStaticFilesStorage',
+}
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': STATIC_PIPELINE_STORAGE if STATIC_PIPELINE else {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
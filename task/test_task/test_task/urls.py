@@ -14,10 +14,22 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, include, re_path
+
+from auth_form_test import staticfiles
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('', include('auth_form_test.urls'))
 ]
+
+if 'django.contrib.admin' in settings.INSTALLED_APPS:
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
+
+if settings.STATIC_PIPELINE:
+    # Под runserver статику перехватывает staticfiles — запускать с --nostatic
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), staticfiles.serve),
+    ]